@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" This is scbench.py (Socketcan Benchmark) script to measure the performance of the CAN Bus tools.
+
+This file is a temporary script for test & debug.
+
+In this version we implemented a benchmark suite that generates synthetic dump files (see
+scgen.py) of 1e5, 1e6 and 1e7 frames and runs every tool on them, each one in its own
+process:
+
+    python3 scbench.py [--sizes 1e5,1e6,1e7] [--tools scds,scconv,...] [--output scbench.json]
+
+For every tool and size it reports the wall clock time, the rows/s, the MB/s of input text
+and the peak RSS (the largest resident set size of the tool process and of its children,
+e.g. the scds parallel workers). Results are written to a JSON file together with the tool
+versions, so runs can be compared across versions. Generated files are kept in the work
+directory and reused by the following runs.
+
+=========================================================================================
+
+Versions history:
+
+v.0.0.2 (20261017):
+- added the scfmt.py conversions to Vector ASC and binary logs.
+
+v.0.0.1 (20261017):
+- scconv.py is benchmarked through its command line arguments, without copying its input file.
+
+v.0.0.0 (20261017):
+- baseline version.
+
+=========================================================================================
+
+This script can be improved a lot!"""
+
+__version__    =  "0.0.2"
+
+__author__     =  "Valerio Vannucci"
+__copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
+__credits__    = ["Valerio Vannucci"]
+__license__    =  "Creative Commons 4.0 International: CC-B-Y-S-A"
+__maintainer__ =  "Valerio Vannucci"
+__email__      =  "valerio.vannucci@iaiagi.com"
+__status__     =  "Prototype"
+
+# Import statements here
+import os                                                      # File system and processes management
+import sys                                                     # Standard output and command line management
+import json                                                    # Results file management
+import time                                                    # Time management
+import argparse                                                # Command line arguments management
+import platform                                                # Machine description
+import subprocess                                              # Tools processes management
+import collections                                             # Specialized data types management
+
+import scgen                                                   # Synthetic dump files generator
+
+# Global variables here
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))         # The tools are next to this script
+WORK_DIR = 'scbench_data'                                      # Default directory of the generated files
+OUTPUT_FILE = 'scbench.json'                                   # Default results file
+SIZES = '1e5,1e6,1e7'                                          # Default numbers of frames
+
+# Benchmarks: name -> (input format, script and command line arguments)
+# '{input}' is replaced by the input file name, '{output}' by an output file name in the work directory
+BENCHMARKS = collections.OrderedDict([
+    ('scds', ('socketcan', ['scds.py', '{input}'])),
+    ('scds-workers', ('socketcan', ['scds.py', '--workers', '0', '{input}'])),
+    ('sccache', ('socketcan', ['sccache.py', '--force', '{input}'])),
+    ('scds-timing', ('socketcan', ['scds.py', '--timing', '{input}'])),
+    ('scconv', ('newdep', ['scconv.py', '{input}', '{output}'])),
+    ('scfmt-asc', ('socketcan', ['scfmt.py', '--to', 'asc', '{input}', '{output}'])),
+    ('scfmt-binary', ('socketcan', ['scfmt.py', '--to', 'binary', '{input}', '{output}'])),
+])
+
+
+# Custom functions here
+def input_file(workdir, fmt, frames):
+    """ Return the name of the generated input file of a format and size, generating it if missing """
+    filename = os.path.join(workdir, 'scbench-%s-%d.%s' % (fmt, frames, 'dump' if fmt == 'socketcan' else 'txt'))
+    if not os.path.exists(filename):
+        scgen.generate(filename + '.tmp', frames, fmt=fmt, compression=None)
+        os.rename(filename + '.tmp', filename)
+    return filename
+
+
+def run(command, cwd):
+    """ Run a tool and return (seconds, peak RSS in KB, exit code) """
+    env = dict(os.environ, PYTHONPATH=TOOLS_DIR)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull:
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=devnull)
+        _, status, usage = os.wait4(process.pid, 0)            # Resource usage of the tool and of its waited children
+    seconds = time.perf_counter() - start
+    return seconds, usage.ru_maxrss, os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
+
+
+def benchmark(name, frames, workdir):
+    """ Run a benchmark on the generated file of 'frames' frames and return its result """
+    fmt, arguments = BENCHMARKS[name]
+    filename = os.path.abspath(input_file(workdir, fmt, frames))
+    cwd = os.path.abspath(workdir)
+    output = os.path.join(cwd, 'scbench-%s-%d.out' % (name, frames))
+    if os.path.exists(output):                                 # Converters append to their output file
+        os.remove(output)
+    command = [sys.executable] + [os.path.join(TOOLS_DIR, arguments[0])] + \
+              [argument.replace('{input}', filename).replace('{output}', output) for argument in arguments[1:]]
+
+    seconds, rss, code = run(command, cwd)
+    if os.path.exists(output):
+        os.remove(output)
+    size = os.path.getsize(filename)
+    return collections.OrderedDict([
+        ('tool', name), ('frames', frames), ('bytes', size), ('seconds', round(seconds, 3)),
+        ('lines_per_s', round(frames / seconds)), ('mb_per_s', round(size / seconds / 1e6, 2)),
+        ('peak_rss_kb', rss), ('exit_code', code)])
+
+
+def tool_versions():
+    """ Return the versions of the benchmarked tools, read from their sources """
+    versions = {}
+    for name in sorted(set(arguments[0] for fmt, arguments in BENCHMARKS.values())):
+        with open(os.path.join(TOOLS_DIR, name)) as source:
+            for line in source:
+                if line.startswith('__version__'):
+                    versions[name] = line.split('=')[1].strip().strip('"\'')
+                    break
+    return versions
+
+
+def main(argv=None):
+    """ Command line wrapper of the benchmark suite """
+    parser = argparse.ArgumentParser(description='Measure the performance of the CAN Bus tools on synthetic dump files.')
+    parser.add_argument('-s', '--sizes', default=SIZES, help='comma separated numbers of frames (default: %s)' % SIZES)
+    parser.add_argument('-t', '--tools', default=','.join(BENCHMARKS),
+                        help='comma separated benchmarks (default: %s)' % ','.join(BENCHMARKS))
+    parser.add_argument('-w', '--workdir', default=WORK_DIR,
+                        help="directory of the generated files (default: '%s')" % WORK_DIR)
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE,
+                        help="JSON results file (default: '%s')" % OUTPUT_FILE)
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(size)) for size in args.sizes.split(',')]
+    names = [name for name in args.tools.split(',') if name]
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark: %s' % name)
+    os.makedirs(args.workdir, exist_ok=True)
+
+    results = []
+    print('TOOL -> FRAMES -> SECONDS -> LINES/s -> MB/s -> PEAK RSS (MB)')
+    for frames in sizes:
+        for name in names:
+            result = benchmark(name, frames, args.workdir)
+            results.append(result)
+            print('%s -> %s -> %.2f -> %s -> %.1f -> %.1f%s' % (
+                name, frames, result['seconds'], result['lines_per_s'], result['mb_per_s'],
+                result['peak_rss_kb'] / 1024.0, '' if result['exit_code'] == 0 else ' (FAILED)'))
+
+    with open(args.output, 'w') as outfile:
+        json.dump(collections.OrderedDict([
+            ('date', time.strftime('%Y-%m-%dT%H:%M:%S')), ('python', platform.python_version()),
+            ('machine', platform.machine()), ('cpus', os.cpu_count()), ('versions', tool_versions()),
+            ('results', results)]), outfile, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
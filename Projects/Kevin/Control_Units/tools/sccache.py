@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" This is sccache.py (Socketcan Cache) script to build a columnar binary cache of Socketcan CAN Bus dump files.
+
+This file is a temporary script for test & debug.
+
+Every tool used to re-parse the text rows of the dump files from scratch on every run.
+This script converts a Socketcan dump file into a compact columnar cache that the tools
+can load with NumPy memory-mapping and no parsing at all. The cache is a directory named
+after the dump file (e.g. 'inputfile.dump.cache') that contains one '.npy' file for each
+column:
+
+    ts.npy      int64       timestamps in microseconds
+    id.npy      uint32      CAN IDs (extended IDs have the CAN_EFF_FLAG bit set)
+    chan.npy    uint8       channel index (see 'channels' in meta.json)
+    dlc.npy     uint8       payload lenght in Bytes
+    data.npy    uint8[8]    payload, zero padded to 8 Bytes
+
+and a 'meta.json' file with the cache format version, the channel names and the mtime
+and size of the source dump file. The cache is built once and reused while the source
+file mtime and size are unchanged, otherwise it is built again:
+
+    python3 sccache.py [--force] inputfile.dump
+
+The dump file can be gzip, bz2 or xz compressed (see scio.py).
+
+=========================================================================================
+
+Versions history:
+
+v.0.1.0 (20261017):
+- added the support of gzip, bz2 and xz compressed dump files.
+
+v.0.0.0 (20261017):
+- baseline version.
+
+=========================================================================================
+
+This script can be improved a lot!"""
+
+__version__    =  "0.1.0"
+
+__author__     =  "Valerio Vannucci"
+__copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
+__credits__    = ["Valerio Vannucci"]
+__license__    =  "Creative Commons 4.0 International: CC-B-Y-S-A"
+__maintainer__ =  "Valerio Vannucci"
+__email__      =  "valerio.vannucci@iaiagi.com"
+__status__     =  "Prototype"
+
+# Import statements here
+import os                                                      # File system management
+import sys                                                     # Standard output and command line management
+import json                                                    # Cache metadata management
+import array                                                   # Compact arrays of numbers used while parsing
+import argparse                                                # Command line arguments management
+import collections                                             # Specialized data types management
+
+import numpy as np                                             # Columnar arrays and memory-mapping management
+
+import scio                                                    # Plain and compressed dump files I/O
+
+# Global variables here
+CACHE_VERSION = 1                                              # Cache format version: caches of other versions are rebuilt
+CACHE_SUFFIX = '.cache'                                        # Cache directory name is the dump file name plus this suffix
+CAN_EFF_FLAG = 0x80000000                                      # Extended frame format flag (as in the SocketCAN API)
+COLUMNS = ('ts', 'id', 'chan', 'dlc', 'data')                  # Columns of the cache, one '.npy' file each
+
+# Custom classes here
+CanFrames = collections.namedtuple('CanFrames', COLUMNS + ('channels',))
+CanFrames.__doc__ = """ Columnar CAN frames: one NumPy array per column plus the list of the channel names """
+
+
+# Custom functions here
+def parse_timestamp(text):
+    """ Convert a Socketcan timestamp string (e.g. '1465912800.001000') into integer microseconds """
+    sec, _, frac = text.partition('.')
+    return int(sec) * 1000000 + int((frac + '000000')[:6])
+
+
+def format_canid(canid):
+    """ Format a cached CAN ID the way Socketcan writes it in the dump files (e.g. '201') """
+    canid = int(canid)
+    if canid & CAN_EFF_FLAG:
+        return '%08X' % (canid & ~CAN_EFF_FLAG)
+    return '%03X' % canid
+
+
+def cache_path(dumpfile):
+    """ Return the cache directory of a dump file """
+    return dumpfile + CACHE_SUFFIX
+
+
+def _source_stamp(dumpfile):
+    """ Return what identifies a version of the source dump file """
+    info = os.stat(dumpfile)
+    return {'mtime_ns': info.st_mtime_ns, 'size': info.st_size}
+
+
+def read_meta(cachedir):
+    """ Return the metadata of a cache directory or None if it is missing or unreadable """
+    try:
+        with open(os.path.join(cachedir, 'meta.json')) as metafile:
+            return json.load(metafile)
+    except (OSError, ValueError):
+        return None
+
+
+def is_valid(dumpfile, cachedir=None):
+    """ Check whether the cache of a dump file exists and is up to date """
+    meta = read_meta(cachedir or cache_path(dumpfile))
+    return (meta is not None and meta.get('version') == CACHE_VERSION
+            and meta.get('source') == _source_stamp(dumpfile))
+
+
+def parse_lines(lines):
+    """ Parse Socketcan dump file rows into columnar CAN frames (arrays are in memory) """
+    ts = array.array('q')
+    ids = array.array('I')
+    chan = array.array('B')
+    dlc = array.array('B')
+    data = bytearray()
+    channels = collections.OrderedDict()                       # Channel name -> channel index
+    pad = bytes(8)
+
+    for line in lines:                                         # Start processing the input one row at a time
+        inputlist = line.split()
+        if len(inputlist) < 3:                                 # Skip rows with no meaningful data
+            continue
+        cancode, sep, payload = inputlist[2].partition('#')
+        if not sep:
+            continue
+        canid = int(cancode, 16)
+        if len(cancode) > 3:                                   # Socketcan writes extended IDs with 8 digits
+            canid |= CAN_EFF_FLAG
+        if payload[:1] == 'R':                                 # Remote frames carry no data
+            payload = ''
+        raw = bytes.fromhex(payload[:16])
+        index = channels.get(inputlist[1])
+        if index is None:
+            index = channels[inputlist[1]] = len(channels)
+
+        ts.append(parse_timestamp(inputlist[0].strip('()')))
+        ids.append(canid)
+        chan.append(index)
+        dlc.append(len(raw))
+        data += raw + pad[len(raw):]
+
+    return CanFrames(ts=np.frombuffer(ts, dtype=np.int64).copy(),
+                     id=np.frombuffer(ids, dtype=np.uint32).copy(),
+                     chan=np.frombuffer(chan, dtype=np.uint8).copy(),
+                     dlc=np.frombuffer(dlc, dtype=np.uint8).copy(),
+                     data=np.frombuffer(bytes(data), dtype=np.uint8).reshape(-1, 8).copy(),
+                     channels=list(channels))
+
+
+def build_cache(dumpfile, cachedir=None):
+    """ Parse a dump file once and write its columnar cache, return the cache directory """
+    cachedir = cachedir or cache_path(dumpfile)
+    stamp = _source_stamp(dumpfile)                            # Taken before reading: a file changing meanwhile is not trusted
+    with scio.open_input(dumpfile) as inputfile:
+        frames = parse_lines(inputfile)
+
+    os.makedirs(cachedir, exist_ok=True)
+    metafile = os.path.join(cachedir, 'meta.json')
+    if os.path.exists(metafile):                               # Invalidate the old cache before overwriting its columns
+        os.remove(metafile)
+    for column in COLUMNS:
+        np.save(os.path.join(cachedir, column + '.npy'), getattr(frames, column))
+    with open(metafile, 'w') as outfile:                       # Written last, so that a partial cache is never valid
+        json.dump({'version': CACHE_VERSION, 'source': stamp, 'frames': len(frames.ts),
+                   'channels': frames.channels}, outfile, indent=1)
+    return cachedir
+
+
+def load(dumpfile, cachedir=None, rebuild=True):
+    """ Return the memory-mapped columnar CAN frames of a dump file
+
+    The cache is (re)built when missing or out of date, unless 'rebuild' is False:
+    in that case a FileNotFoundError is raised. """
+    cachedir = cachedir or cache_path(dumpfile)
+    if not is_valid(dumpfile, cachedir):
+        if not rebuild:
+            raise FileNotFoundError('No valid cache for %s' % dumpfile)
+        build_cache(dumpfile, cachedir)
+
+    columns = {column: np.load(os.path.join(cachedir, column + '.npy'), mmap_mode='r') for column in COLUMNS}
+    return CanFrames(channels=read_meta(cachedir)['channels'], **columns)
+
+
+def main(argv=None):
+    """ Command line wrapper of the cache builder """
+    parser = argparse.ArgumentParser(description='Build the columnar binary cache of a Socketcan CAN Bus dump file.')
+    parser.add_argument('inputfile', help='Socketcan dump file')
+    parser.add_argument('-f', '--force', action='store_true', help='rebuild the cache even if it is up to date')
+    args = parser.parse_args(argv)
+
+    cachedir = cache_path(args.inputfile)
+    if args.force or not is_valid(args.inputfile, cachedir):
+        build_cache(args.inputfile, cachedir)
+        print('Cache built: %s' % cachedir)
+    else:
+        print('Cache up to date: %s' % cachedir)
+    meta = read_meta(cachedir)
+    print('Frames: %s' % meta['frames'])
+    print('Channels: %s' % ', '.join(meta['channels']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
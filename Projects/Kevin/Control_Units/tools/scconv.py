@@ -1,4 +1,4 @@
-#!/usr/bin/env python3.5
+#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """ This is scconv.py (Socketcan Converter) script to convert New Dep CAN Bus dump files to Socketcan format.
 
@@ -8,12 +8,81 @@ In this version we implemented a simple script to convert New Dep CAN Bus dump f
 into the socketcan dump file format. To use this script you have to copy source files
 into the same script's directory. Format converted files are copied into the same
 directory so source and destination files cannot have the same name. We suggest to
-change at least the file extension and keep the same name of the source file.
+change at least the file extension and keep the same name of the source file. Source and
+destination files can also be given on the command line:
+
+    python3 scconv.py [--compression gz|bz2|xz|auto] [--base-epoch E] [--start HH:MM:SS] [source [destination]]
+
+The conversion is a pipeline of generators (read -> parse -> convert -> format) and the
+converted rows are written in batches of BATCH_ROWS rows through a single buffered output
+stream. Other tools can consume the converted frames in-process, without a temporary file,
+through 'convert_lines()' and 'convert_file()' (see 'Frame').
+
+Many recordings can be converted at once, in parallel by a pool of processes:
+
+    python3 scconv.py --batch recordings/ 'session*.txt' [--workers N] [--outdir DIR]
+
+Directories are expanded to their '*.txt' files and glob patterns to the matching files.
+Every file is converted into a file with the same name and the '.dump' extension
+(overwritten if it exists) and files larger than CHUNK_SIZE are split into row aligned
+chunks converted in parallel too; converted chunks are written in order, so the output is
+the same as the one of a single process. A per file throughput summary is printed at the
+end. Compressed source files cannot be split and are converted by a single process.
+
+New Dep rows always carry 8 data Bytes, whatever the real payload lenght of the CAN ID.
+Payload lenghts are looked up in a per vehicle table (VEHICLE, '--vehicle'): the tables
+are in 'scconv_dlc.json', next to this script, and CAN IDs not in the table get
+DEFAULT_DLC Bytes. For a new vehicle, '--infer' reads the source file once more before
+the conversion and infers the payload lenght of the CAN IDs not in the table from the
+data: trailing Bytes that never change and are always 0x00 or 0xFF (PADDING) are
+considered padding (CAN IDs whose payload is always padding are reported and keep
+DEFAULT_DLC Bytes). '--save-vehicle NAME' stores the resulting table, so the following
+conversions of that vehicle do not need the inference pass.
+
+New Dep timestamps are seconds:milliseconds:microseconds from the start of the recording
+and carry no date: they are converted to Epoch timestamps adding the recording start
+time (RECORDING_START, 16.00) to the recording date (BASE_EPOCH, 14/06/2016 00.00 in
+Italy, when we first collected the Ford Fiesta (kevin) CAN Bus recordings). The rows are
+converted a block at a time with integer microseconds arithmetic in NumPy, and the
+timestamps are formatted as fixed width strings (10 digits, dot, 6 digits) in one step.
+
+The source file can be gzip, bz2 or xz compressed (the compression is detected by the
+file magic bytes, see scio.py) and it is decompressed while it is read. Set COMPRESSION
+to write the destination file compressed too.
 
 =========================================================================================
 
 Versions history:
 
+v.0.5.2 (20261017):
+- batch mode whole (compressed) source files are streamed to the destination by the worker
+  process instead of being returned as one string.
+
+v.0.5.1 (20261017):
+- batch mode payload lenghts inference (--infer) runs in the process pool, once per file.
+- CAN IDs whose payload is always padding keep DEFAULT_DLC Bytes instead of none.
+
+v.0.5.0 (20261017):
+- payload lenghts are looked up in per vehicle tables (scconv_dlc.json) instead of an if/elif chain.
+- added the payload lenghts inference from the data (--infer, --save-vehicle).
+
+v.0.4.0 (20261017):
+- added the parallel batch conversion of many files (--batch).
+
+v.0.3.0 (20261017):
+- timestamps converted a block at a time with NumPy integer microseconds, without datetime.
+- configurable recording date and start time; recordings longer than 8 hours are supported.
+- timestamps are always 6 decimals (e.g. '.000000' rows were written as '.0').
+
+v.0.2.0 (20261017):
+- restructured the conversion as a generator pipeline with a reusable in-process API.
+- converted rows are written in batches through a single buffered output stream.
+- added the command line arguments.
+
+v.0.1.0 (20261017):
+- added the support of gzip, bz2 and xz compressed source and destination files.
+- the destination file is now opened only once.
+
 v.0.0.1 (20180222):
 - added Version history to this script description.
 
@@ -24,7 +93,7 @@ v.0.0.0 (20180221):
 
 This script can be improved a lot!"""
 
-__version__    =  "0.0.1"
+__version__    =  "0.5.2"
 
 __author__     =  "Valerio Vannucci"
 __copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
@@ -35,11 +104,21 @@ __email__      =  "valerio.vannucci@iaiagi.com"
 __status__     =  "Prototype"
 
 # Import statements here
-from datetime import datetime                               # Date and Time management
+import os                                                   # File system and CPU count management
+import sys                                                  # Standard output and command line management
+import mmap                                                 # Memory-mapped file management
+import glob                                                 # Batch source files patterns management
+import json                                                 # Payload lenghts tables management
+import time                                                 # Time management
+import argparse                                             # Command line arguments management
+import collections                                          # Specialized data types management
+import functools                                            # Payload lenghts tables caching
+import multiprocessing                                      # Process pool management
 
-# Custom functions here
-# def custom_function():
-#     pass
+import numpy as np                                          # Block timestamps conversion
+
+import scio                                                 # Plain and compressed dump files I/O
+import scds                                                 # Row aligned split of the dump files
 
 # Global variables here
 source = 'new_dep_can_dump_file.txt'                        # Set input filename here (New Dep CAN Bus dump file format)
@@ -47,85 +126,406 @@ destination = 'new_dep_can_dump_file.dump'                  # Set output filenam
                                                             # Please, NOTE that input and output
                                                             # files must be under the same directory
                                                             # of this script and that we changed only the file extension
+COMPRESSION = None                                          # Set 'gz', 'bz2' or 'xz' to write a compressed output file,
+                                                            # 'auto' to take it from the output file extension
+BATCH_ROWS = 4096                                           # Converted rows written to the output file at once
+CHANNELS = {'1': 'can0', '2': 'can1'}                       # New Dep CAN Bus channel -> Socketcan CAN Bus channel
+BASE_EPOCH = 1465855200                                     # Epoch of the recording date: 14/06/2016 00.00 (CEST)
+RECORDING_START = 16 * 3600                                 # Recording start time in seconds from BASE_EPOCH: 16.00
+                                                            # Please, NOTE that the original recordings don't carry
+                                                            # the date and time, these are the Fiesta recordings ones
+BATCH_PATTERN = '*.txt'                                     # Source files of a directory in batch mode
+BATCH_EXTENSION = '.dump'                                   # Destination files extension in batch mode
+CHUNK_SIZE = 16 << 20                                       # Larger source files are split into chunks of this size in Bytes
+DLC_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scconv_dlc.json')    # Payload lenghts tables
+VEHICLE = 'fiesta'                                          # Default payload lenghts table
+DEFAULT_DLC = 8                                             # Payload lenght of the CAN IDs not in the table
+PADDING = (0x00, 0xFF)                                      # Values of the padding Bytes for the payload lenghts inference
+INFER_MIN_FRAMES = 10                                       # Fewer frames are not enough to infer a payload lenght
+DIGITS = 10 ** np.arange(15, -1, -1, dtype=np.int64)        # Decimal digits weights of a timestamp in microseconds
 
-# Start of input and output file processing here                                                        
-with open(source, 'r') as inputfile:                        # Start processing source file
+# Custom classes here
+Frame = collections.namedtuple('Frame', ('timestamp', 'channel', 'canid', 'payload'))
+Frame.__doc__ = """ A converted frame: Epoch timestamp, channel, CAN ID and payload as written in a Socketcan row """
 
-    inputlist = []                                          # This list will contain all the file sinlge row items
-    canbus = ''                                             # Used to trace which CAN Bus channel the line refers to
-    loop = False                                            # Used to continue processing the file or stop in case of errors
 
-    for line in inputfile:                                  # Start processing each source file rows
+# Custom functions here
+def parse_rows(lines):
+    """ Split New Dep dump file rows into their items, None for rows with no meaningful data """
+    for line in lines:                                      # Start processing each source file rows
         inputlist = line.split()                            # Add the processed row items into a list
+        if len(inputlist) > 0 and inputlist[0] in CHANNELS: # Skip empty rows and rows without significant data
+            yield inputlist
+        else:
+            yield None                                      # This is not a CAN Bus channel row
 
-        if len(inputlist) > 0 and inputlist[0] == '1':      # Skip empty rows and rows without significant data
-            canbus = 'can0'                                 # If first item of the row is 1 then CAN Bus channel is can0
-            loop = True                                     # Continue to process the file
-        elif len(inputlist) > 0 and inputlist[0] == '2':    # Else
-            canbus = 'can1'                                 # If first item of the row is 2 then CAN Bus channel is can1
-            loop = True                                     # Continue to process the file
-        else:                                               # Else
-            canbus = 'ERR'                                  # This is not a CAN Bus channel row
-            loop = False                                    # So stop processing this row
-
-        if loop == True:                                    # Check whether makes sense to continue row processing
-
-            hours = 0                                       # Initialize fake acquisition time with hours
-            sec, millis, micros = inputlist[1].split(':')   # seconds, milliseconds and microseconds from source dump file row
-            minutes, seconds = divmod(int(sec), 60)         # Properly convert into seconds, minutes and hours
-            hours, minutes = divmod(minutes, 60)
-            microseconds = millis + micros                  # Generate a proper string to represent microseconds
-
-            # Generates Epoch Unix timestamp from fake hours, minutes and seconds
-            # Please, NOTE that date is set to 14/06/2016, when we first collected the Ford Fiesta (kevin) CAN Bus recordings
-            # Fake 'hours' is an offset from 04.00 pm (16.00), the time we started the CAN Bus recording activity
-            # All these assumptions are required because the original recordings don't carry the date and time timestamp
-            # so we had to find a way to generate a working Epoch Unix timestamp conversion
-            logtime = str(datetime.timestamp(datetime(2016, 6, 14, 16 + hours, minutes, seconds, int(microseconds))))
-
-            if len(logtime) == 14:                          # Processing the Epoch Unix timestamp padding to have the
-                logtime = logtime + '000'                   # same Epoch values lenght
-            elif len(logtime) == 15:
-                logtime = logtime +'00' 
-            elif len(logtime) == 16:
-                logtime = logtime + '0'
-
-            if inputlist[4] == '00':                        # Processing CAN IDs padding to have the same values lenght
-                cancode = '0' + inputlist[5]
-            else:
-                cancode = inputlist[4].lstrip('0') + inputlist[5]
-
-            payload = ''                                    # Initialize CAN Bus messages payload
-
-            if cancode == '280':                            # Processing of Ford CAN Bus messages payload lenght
-                for index in range(6, 8):                   # according to what we found from a Ford Focus C-Max (Year 2003)
-                    payload += inputlist[index]             # lenght of the same CAN IDs (this can be managed in a different
-            elif cancode == '240' or cancode == '275':      # manner if we want to be sure that we don't loose any data during
-                for index in range(6, 9):                   # the processing of CAN IDs: to be modified in future releases)
-                    payload += inputlist[index]
-            elif cancode == '428' or cancode == '4F2':
-                for index in range(6, 10):
-                    payload += inputlist[index]
-            elif cancode == '430':
-                for index in range(6, 12):
-                    payload += inputlist[index]
-            elif cancode == '080' or cancode == '231':
-                for index in range(6, 13):
-                    payload += inputlist[index]
+
+def parse_start(text):
+    """ Convert a recording start time ('HH:MM:SS', 'HH:MM' or seconds) into seconds """
+    seconds = 0
+    for item in text.split(':'):
+        seconds = seconds * 60 + int(item)
+    return seconds * 60 ** (2 - text.count(':')) if ':' in text else seconds
+
+
+def timestamps(times, offset):
+    """ Convert New Dep 'sec:millis:micros' times into Epoch microseconds (NumPy int64 array)
+
+    'offset' is the Epoch of the recording start in microseconds. """
+    values = np.fromstring(' '.join(times).replace(':', ' '), dtype=np.int64, sep=' ')
+    if len(values) != 3 * len(times):
+        raise ValueError('Malformed timestamp in rows block')
+    values = values.reshape(-1, 3)
+    return offset + (values[:, 0] * 1000 + values[:, 1]) * 1000 + values[:, 2]
+
+
+def format_timestamps(microseconds):
+    """ Format Epoch microseconds as fixed width 'ssssssssss.uuuuuu' strings """
+    chars = np.empty((len(microseconds), 17), dtype=np.uint32)    # One UCS4 character per cell
+    digits = microseconds[:, None] // DIGITS % 10 + ord('0')
+    chars[:, :10] = digits[:, :10]
+    chars[:, 10] = ord('.')
+    chars[:, 11:] = digits[:, 10:]
+    return chars.view('U17').ravel().tolist()
+
+
+def load_dlc_tables(filename=DLC_FILE):
+    """ Return all the per vehicle payload lenghts tables: vehicle -> {'description': ..., 'dlc': {CAN ID: lenght}} """
+    with open(filename) as tablefile:
+        return json.load(tablefile)
+
+
+@functools.lru_cache()
+def dlc_table(vehicle=VEHICLE, filename=DLC_FILE):
+    """ Return the payload lenghts table of a vehicle as a dict: CAN ID (e.g. '4F2') -> lenght in Bytes """
+    tables = load_dlc_tables(filename)
+    if vehicle not in tables:
+        raise KeyError('No payload lenghts table for vehicle %s in %s' % (vehicle, filename))
+    return tables[vehicle]['dlc']
+
+
+def save_dlc_table(vehicle, lengths, description='', filename=DLC_FILE):
+    """ Add (or replace) the payload lenghts table of a vehicle """
+    tables = load_dlc_tables(filename) if os.path.exists(filename) else {}
+    tables[vehicle] = {'description': description, 'dlc': dict(sorted(lengths.items()))}
+    with open(filename + '.tmp', 'w') as tablefile:
+        json.dump(tables, tablefile, indent=1)
+    os.replace(filename + '.tmp', filename)
+    dlc_table.cache_clear()
+
+
+def cancode_of(inputlist):
+    """ Return the CAN ID of a split New Dep row as written in the Socketcan rows """
+    if inputlist[4] == '00':                                # Processing CAN IDs padding to have the same values lenght
+        return '0' + inputlist[5]
+    return inputlist[4].lstrip('0') + inputlist[5]
+
+
+def infer_lengths(lines, min_frames=INFER_MIN_FRAMES, undetermined=None):
+    """ Infer the payload lenght of every CAN ID of New Dep dump file rows
+
+    Trailing Bytes whose value never changes and is one of PADDING are padding; CAN IDs
+    with fewer than 'min_frames' frames get DEFAULT_DLC. CAN IDs whose payload is always
+    padding are left out (their lenght cannot be told from the data) and appended to the
+    'undetermined' list, if given. Returns CAN ID -> lenght. """
+    first = {}                                              # CAN ID -> first payload as an integer
+    changed = {}                                            # CAN ID -> bits that changed at least once
+    frames = collections.Counter()
+    for inputlist in parse_rows(lines):
+        if inputlist is None or len(inputlist) < 14:
+            continue
+        cancode = cancode_of(inputlist)
+        value = int(''.join(inputlist[6:14]), 16)
+        if cancode in first:
+            changed[cancode] |= value ^ first[cancode]
+        else:
+            first[cancode] = value
+            changed[cancode] = 0
+        frames[cancode] += 1
+
+    lengths = {}
+    for cancode, value in first.items():
+        lenght = DEFAULT_DLC
+        if frames[cancode] >= min_frames:
+            while lenght > 0:                               # Drop the constant padding Bytes from the end
+                shift = (8 - lenght) * 8
+                if (changed[cancode] >> shift) & 0xFF or (value >> shift) & 0xFF not in PADDING:
+                    break
+                lenght -= 1
+        if lenght == 0:                                     # Never a meaningful Byte: DEFAULT_DLC, not 0
+            if undetermined is not None:
+                undetermined.append(cancode)
+            continue
+        lengths[cancode] = lenght
+    return lengths
+
+
+def infer_file(filename, lengths=None):
+    """ Return the payload lenghts table of a New Dep dump file: 'lengths' items plus the inferred ones """
+    undetermined = []
+    with scio.open_input(filename) as inputfile:
+        inferred = infer_lengths(inputfile, undetermined=undetermined)
+    table = dlc_table() if lengths is None else lengths
+    undetermined = [cancode for cancode in undetermined if cancode not in table]
+    if undetermined:
+        print('%s: payload lenght undetermined (always padding), %s Bytes used for: %s' % (
+            os.path.basename(filename), DEFAULT_DLC, ' '.join(sorted(undetermined))), file=sys.stderr)
+    inferred.update(table)                                  # The table lenghts win over the inferred ones
+    return inferred
+
+
+def convert_row(inputlist, logtime, lengths):
+    """ Convert the items of a New Dep dump file row, and its formatted timestamp, into a Frame """
+    canbus = CHANNELS[inputlist[0]]                         # If first item of the row is 1 then CAN Bus channel is can0, if 2 is can1
+    cancode = cancode_of(inputlist)
+    lenght = lengths.get(cancode, DEFAULT_DLC)              # Payload lenght from the vehicle table
+    payload = ''.join(inputlist[6:6 + lenght])              # Initialize CAN Bus messages payload
+
+    return Frame(logtime, canbus, cancode, payload)
+
+
+def convert_block(rows, offset, lengths):
+    """ Convert a block of split New Dep dump file rows into Frames """
+    logtimes = format_timestamps(timestamps([inputlist[1] for inputlist in rows], offset))
+    return [convert_row(inputlist, logtime, lengths) for inputlist, logtime in zip(rows, logtimes)]
+
+
+def convert_lines(lines, warn=True, base=BASE_EPOCH, start=RECORDING_START, lengths=None):
+    """ Convert an iterable of New Dep dump file rows and yield the converted Frames
+
+    'base' is the Epoch of the recording date and 'start' the recording start time in
+    seconds from it. 'lengths' is the payload lenghts table (default: the VEHICLE one).
+    With 'warn' a warning is printed out for every row with no meaningful data. """
+    offset = (base + start) * 1000000
+    lengths = dlc_table() if lengths is None else lengths
+    block = []
+    for inputlist in parse_rows(lines):
+        if inputlist is not None:                           # Check whether makes sense to continue row processing
+            block.append(inputlist)
+            if len(block) >= BATCH_ROWS:                    # Timestamps are converted a block at a time
+                yield from convert_block(block, offset, lengths)
+                block = []
+        elif warn:                                          # Send to the standard output a warning that the file contains
+            print('A line cannot be processed!')            # a row with no meaningful data
+    if block:
+        yield from convert_block(block, offset, lengths)
+
+
+def convert_file(filename, warn=True, base=BASE_EPOCH, start=RECORDING_START, lengths=None):
+    """ Yield the converted Frames of a (plain or compressed) New Dep dump file """
+    with scio.open_input(filename) as inputfile:
+        yield from convert_lines(inputfile, warn, base, start, lengths)
+
+
+def format_frames(frames):
+    """ Format Frames as Socketcan dump file rows """
+    for frame in frames:                                    # Builds the final complete Socketcan dump file row output
+        yield '(' + frame.timestamp + ') ' + frame.channel + ' ' + frame.canid + '#' + frame.payload + '\n'
+
+
+def write_rows(rows, outfile, batch=BATCH_ROWS):
+    """ Write rows to an open output stream in batches and return how many rows were written """
+    count = 0
+    buf = []
+    for row in rows:
+        buf.append(row)
+        if len(buf) >= batch:                               # One write call every 'batch' rows
+            outfile.writelines(buf)
+            count += len(buf)
+            buf = []
+    outfile.writelines(buf)
+    return count + len(buf)
+
+
+def convert(source, destination, compression=COMPRESSION, append=True, base=BASE_EPOCH, start=RECORDING_START,
+            lengths=None):
+    """ Convert a New Dep dump file into a Socketcan dump file and return the number of converted rows
+
+    The destination file is appended to, unless 'append' is False. """
+    with scio.open_output(destination, compression, append=append) as outfile:
+        return write_rows(format_frames(convert_file(source, True, base, start, lengths)), outfile)
+
+
+def batch_sources(patterns):
+    """ Expand directories and glob patterns into a sorted list of source files (without duplicates) """
+    sources = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, BATCH_PATTERN)
+        for filename in sorted(glob.glob(pattern)) or [pattern]:    # Not matching names are reported as missing files
+            if filename not in sources:
+                sources.append(filename)
+    return sources
+
+
+def batch_destination(filename, outdir=None, compression=None):
+    """ Return the destination file of a source file in batch mode """
+    name = os.path.basename(filename)
+    if scio.compression_of(name):                           # 'rec.txt.gz' -> 'rec.txt'
+        name = os.path.splitext(name)[0]
+    name = os.path.splitext(name)[0] + BATCH_EXTENSION
+    if compression in scio.COMPRESSIONS:
+        name += scio.COMPRESSIONS[compression][2]
+    return os.path.join(outdir if outdir else os.path.dirname(filename), name)
+
+
+def batch_tasks(filename, chunk_size=CHUNK_SIZE):
+    """ Return the (filename, start, end) conversion tasks of a source file, start and end None for a whole file """
+    size = os.path.getsize(filename)
+    if size <= chunk_size or scio.is_compressed(filename):
+        return [(filename, None, None)]
+    with open(filename, 'rb') as inputfile:
+        with mmap.mmap(inputfile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            chunks = scds.split_chunks(buf, -(-size // chunk_size))
+    return [(filename, start, end) for start, end in chunks]
+
+
+def _count(lines, counter):
+    """ Yield the rows of an iterable, counting them into counter[0] """
+    for line in lines:
+        counter[0] += 1
+        yield line
+
+
+def _convert_chunk(args):
+    """ Process pool worker: convert a part of a source file and return (text, rows, bad rows, seconds)
+
+    A whole (compressed) source file ('start' is None) is streamed to the destination by
+    the worker itself and its text is empty, so that it is never held in memory. """
+    filename, start, end, base, recording_start, lengths, destination, compression = args
+    begin = time.perf_counter()
+    counter = [0]
+    if start is None:
+        rows = 0
+        with scio.open_input(filename) as inputfile, scio.open_output(destination, compression) as outfile:
+            for row in format_frames(convert_lines(_count(inputfile, counter), False, base, recording_start, lengths)):
+                outfile.write(row)
+                rows += 1
+        return '', rows, counter[0] - rows, time.perf_counter() - begin
+    else:
+        with open(filename, 'rb') as inputfile:
+            with mmap.mmap(inputfile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                text = buf[start:end].decode('ascii', 'replace')
+        rows = list(format_frames(convert_lines(_count(text.splitlines(), counter), False, base, recording_start, lengths)))
+    return ''.join(rows), len(rows), counter[0] - len(rows), time.perf_counter() - begin
+
+
+def _infer_file(args):
+    """ Process pool worker: return the payload lenghts table of a source file (see 'infer_file()') """
+    return infer_file(*args)
+
+
+def convert_batch(sources, outdir=None, workers=0, compression=COMPRESSION, base=BASE_EPOCH, start=RECORDING_START,
+                  chunk_size=CHUNK_SIZE, lengths=None, infer=False):
+    """ Convert many New Dep dump files in parallel and return their per file results
+
+    Results are OrderedDict items: source -> [destination, Bytes, rows, bad rows, worker
+    seconds]. With 'workers' = 0 all the available CPUs are used. With 'infer' the
+    payload lenghts are inferred for every file by the pool too (see 'infer_file()'),
+    once per file and before its chunks are converted. """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    lengths = dlc_table() if lengths is None else lengths
+    results = collections.OrderedDict()
+    for filename in sources:
+        results[filename] = [batch_destination(filename, outdir, compression), os.path.getsize(filename), 0, 0, 0.0]
+
+    current = outfile = None
+    try:
+        with multiprocessing.Pool(workers) as pool:         # Converted chunks come back in files and rows order
+            if infer:                                       # One inference task for every file
+                tables = pool.map(_infer_file, [(filename, lengths) for filename in sources])
             else:
-                for index in range(6, 14):
-                    payload += inputlist[index]
- 
-            canstring = cancode + '#' + payload             # Convert the CAN Bus messages into the Socketcan dump file format
-            
-            # Builds the final complete Socketcan dump file row output                              
-            outline = '(' + logtime + ') ' + canbus + ' ' + canstring + '\n'
-
-            with open(destination, 'a') as outfile:         # Add a row to the output file with the Socketcan dump file format
-                outfile.write(outline)
+                tables = [lengths] * len(sources)
+            tasks = []
+            for filename, table in zip(sources, tables):    # All the chunks of a file share its table
+                tasks.extend((name, first, last, table) for name, first, last in batch_tasks(filename, chunk_size))
+            jobs = [(filename, first, last, base, start, table, results[filename][0], compression)
+                    for filename, first, last, table in tasks]
+            for (filename, first, last, table), (text, rows, bad, seconds) in zip(tasks, pool.imap(_convert_chunk, jobs)):
+                if first is not None:                       # Whole files are written by their worker
+                    if filename != current:
+                        if outfile is not None:
+                            outfile.close()
+                        current = filename
+                        outfile = scio.open_output(results[filename][0], compression)
+                    outfile.write(text)
+                result = results[filename]
+                result[2] += rows
+                result[3] += bad
+                result[4] += seconds
+    finally:
+        if outfile is not None:
             outfile.close()
+    return results
+
+
+def print_batch(results, seconds, out=sys.stdout):
+    """ Print out the per file throughput summary of a batch conversion """
+    print('FILE -> MB -> ROWS -> BAD ROWS -> SECONDS -> ROWS/s -> MB/s', file=out)
+    for filename, (destination, size, rows, bad, worker) in results.items():
+        print('%s -> %.1f -> %s -> %s -> %.2f -> %.0f -> %.1f' % (
+            os.path.basename(filename), size / 1e6, rows, bad, worker,
+            rows / worker if worker else 0, size / worker / 1e6 if worker else 0), file=out)
+    size = sum(result[1] for result in results.values())
+    rows = sum(result[2] for result in results.values())
+    print('Total: %s files -> %.1f MB -> %s rows in %.2f s (wall clock) -> %.0f rows/s -> %.1f MB/s' % (
+        len(results), size / 1e6, rows, seconds, rows / seconds if seconds else 0,
+        size / seconds / 1e6 if seconds else 0), file=out)
+    print('SECONDS are the conversion time of the worker processes, summed over the chunks of every file', file=out)
+
+
+def main(argv=None):
+    """ Command line wrapper of the converter """
+    parser = argparse.ArgumentParser(description='Convert a New Dep CAN Bus dump file to the Socketcan dump file format.')
+    parser.add_argument('source', nargs='?', default=source,
+                        help="New Dep dump file (default: '%s')" % source)
+    parser.add_argument('destination', nargs='?', default=destination,
+                        help="Socketcan dump file, appended to if it exists (default: '%s')" % destination)
+    parser.add_argument('-c', '--compression', choices=('gz', 'bz2', 'xz', 'auto'), default=COMPRESSION,
+                        help='write the destination file compressed')
+    parser.add_argument('-b', '--base-epoch', type=int, default=BASE_EPOCH,
+                        help='Epoch of the recording date at 00.00 (default: %s)' % BASE_EPOCH)
+    parser.add_argument('-s', '--start', default='%02d:%02d:%02d' % (RECORDING_START // 3600, RECORDING_START // 60 % 60,
+                                                                     RECORDING_START % 60),
+                        help='recording start time as HH:MM:SS or seconds (default: %(default)s)')
+    parser.add_argument('-v', '--vehicle', default=VEHICLE, choices=sorted(load_dlc_tables()),
+                        help='payload lenghts table (default: %s)' % VEHICLE)
+    parser.add_argument('-i', '--infer', action='store_true',
+                        help='infer the payload lenghts of the CAN IDs not in the table from the data')
+    parser.add_argument('--save-vehicle', metavar='NAME',
+                        help='store the payload lenghts table (inferred ones included) as vehicle NAME')
+    parser.add_argument('--batch', nargs='+', metavar='PATTERN',
+                        help="convert in parallel the files of these directories ('%s') or glob patterns" % BATCH_PATTERN)
+    parser.add_argument('-w', '--workers', type=int, default=0,
+                        help='batch mode parallel processes (default: 0, all the CPUs)')
+    parser.add_argument('-o', '--outdir', help='batch mode destination directory (default: next to the source files)')
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        sources = batch_sources(args.batch)
+        for filename in sources:
+            if not os.path.isfile(filename):
+                parser.error('no such file: %s' % filename)
+        if args.outdir:
+            os.makedirs(args.outdir, exist_ok=True)
+        if args.save_vehicle:
+            parser.error('--save-vehicle needs a single source file')
+        begin = time.perf_counter()
+        results = convert_batch(sources, args.outdir, args.workers, args.compression, args.base_epoch,
+                                parse_start(args.start), lengths=dlc_table(args.vehicle), infer=args.infer)
+        print_batch(results, time.perf_counter() - begin)
+        return 0
+
+    lengths = dlc_table(args.vehicle)
+    if args.infer:
+        lengths = infer_file(args.source, lengths)
+    if args.save_vehicle:
+        save_dlc_table(args.save_vehicle, lengths, 'Inferred from %s' % os.path.basename(args.source))
+    convert(args.source, args.destination, args.compression, base=args.base_epoch, start=parse_start(args.start),
+            lengths=lengths)
+    return 0
 
-        else:                                               # Send to the standard output a warning that the file contains
-            print('A line cannot be processed!')            # a row with no meaningful data
 
-inputfile.close()                                           # End processing of inputfile and close the I/O activity
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
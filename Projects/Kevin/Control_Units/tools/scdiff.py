@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" This is scdiff.py (Socketcan Diff) script to compare two CAN Bus dump files in Socketcan dump file format.
+
+This file is a temporary script for test & debug.
+
+In this version we implemented a script to find what changes between two recordings of
+the same car, e.g. a "car on" recording and a "conversion kit" recording, to detect the
+frames that the original electronics stop sending:
+
+    python3 scdiff.py [--rate-threshold R] [--tvd-threshold T] reference.dump other.dump
+
+Both files are indexed once through their columnar cache (see sccache.py) and summarized
+per CAN ID (channels are not taken into account): number of frames, rate over the whole
+recording and a 256 values histogram of every payload Byte. The sorted CAN IDs of the two
+summaries are then merged (no nested scans) and the output reports:
+
+- the CAN IDs present only in the reference recording and only in the other one;
+- the CAN IDs whose rate changed more than RATE_THRESHOLD (relative change);
+- the payload Bytes whose values distribution changed: the total variation distance of
+  the two histograms (0 = same distribution, 1 = no value in common) is at least
+  TVD_THRESHOLD. The most frequent value in both recordings is shown too.
+
+=========================================================================================
+
+Versions history:
+
+v.0.0.0 (20261017):
+- baseline version.
+
+=========================================================================================
+
+This script can be improved a lot!"""
+
+__version__    =  "0.0.0"
+
+__author__     =  "Valerio Vannucci"
+__copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
+__credits__    = ["Valerio Vannucci"]
+__license__    =  "Creative Commons 4.0 International: CC-B-Y-S-A"
+__maintainer__ =  "Valerio Vannucci"
+__email__      =  "valerio.vannucci@iaiagi.com"
+__status__     =  "Prototype"
+
+# Import statements here
+import sys                                                     # Standard output and command line management
+import argparse                                                # Command line arguments management
+import collections                                             # Specialized data types management
+
+import numpy as np                                             # Columnar arrays management
+
+import sccache                                                 # Columnar cache of the dump files
+
+# Global variables here
+BLOCK = 1 << 20                                                # Frames summarized at once
+RATE_THRESHOLD = 0.1                                           # Minimum relative rate change to be reported
+TVD_THRESHOLD = 0.2                                            # Minimum Byte distribution change to be reported
+
+# Custom classes here
+Summary = collections.namedtuple('Summary', ('ids', 'frames', 'duration', 'histograms'))
+Summary.__doc__ = """ Per CAN ID summary of a recording: sorted CAN IDs, frames, duration (s) and Byte histograms """
+
+
+# Custom functions here
+def summarize(frames, block=BLOCK):
+    """ Summarize columnar CAN frames (see sccache.py) per CAN ID
+
+    Histograms are a (CAN IDs x 8 Bytes x 256 values) array of frame counts; only the
+    Bytes within the DLC of every frame are accounted. """
+    ids = np.unique(frames.id)                                 # Sorted unique CAN IDs
+    counts = np.zeros(len(ids), dtype=np.int64)
+    histograms = np.zeros(len(ids) * 8 * 256, dtype=np.int64)
+    for offset in range(0, len(frames.id), block):             # Bounded memory whatever the recording size
+        index = np.searchsorted(ids, frames.id[offset:offset + block])
+        counts += np.bincount(index, minlength=len(ids))
+        data = np.asarray(frames.data[offset:offset + block], dtype=np.int64)
+        valid = np.arange(8) < np.asarray(frames.dlc[offset:offset + block])[:, None]
+        cells = (index[:, None] * 8 + np.arange(8)) * 256 + data
+        histograms += np.bincount(cells[valid], minlength=len(histograms))
+    duration = (int(frames.ts.max()) - int(frames.ts.min())) / 1e6 if len(frames.ts) else 0.0
+    return Summary(ids, counts, duration, histograms.reshape(len(ids), 8, 256))
+
+
+def rate(summary, index):
+    """ Return the rate in frames/s of an item of a summary """
+    return summary.frames[index] / summary.duration if summary.duration > 0 else 0.0
+
+
+def diff(first, second, rate_threshold=RATE_THRESHOLD, tvd_threshold=TVD_THRESHOLD):
+    """ Compare two summaries and return a dict with the lists of the differences """
+    common, ifirst, isecond = np.intersect1d(first.ids, second.ids, assume_unique=True, return_indices=True)
+    result = {
+        'only_first': np.setdiff1d(first.ids, second.ids, assume_unique=True),
+        'only_second': np.setdiff1d(second.ids, first.ids, assume_unique=True),
+        'rates': [],
+        'bytes': [],
+    }
+    for canid, one, two in zip(common, ifirst, isecond):       # Merged sorted CAN IDs, one step each
+        rone, rtwo = rate(first, one), rate(second, two)
+        if rone > 0 and abs(rtwo - rone) / rone >= rate_threshold:
+            result['rates'].append((canid, rone, rtwo))
+        hone = first.histograms[one]
+        htwo = second.histograms[two]
+        tone = hone.sum(axis=1, keepdims=True)
+        ttwo = htwo.sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tvd = 0.5 * np.abs(hone / tone - htwo / ttwo).sum(axis=1)
+        for byte in np.flatnonzero((tvd >= tvd_threshold) & (tone[:, 0] > 0) & (ttwo[:, 0] > 0)):
+            result['bytes'].append((canid, byte, tvd[byte], int(np.argmax(hone[byte])), int(np.argmax(htwo[byte]))))
+    return result
+
+
+def print_diff(result, out=sys.stdout):
+    """ Print out the differences between two recordings """
+    fmt = sccache.format_canid
+    print('CAN codes only in the reference recording: %s' % len(result['only_first']), file=out)
+    if len(result['only_first']):
+        print('\t' + ' '.join(fmt(canid) for canid in result['only_first']), file=out)
+    print('CAN codes only in the other recording: %s' % len(result['only_second']), file=out)
+    if len(result['only_second']):
+        print('\t' + ' '.join(fmt(canid) for canid in result['only_second']), file=out)
+    print('CAN codes rate changes:', file=out)
+    print('\tCOD -> RATE/s -> RATE/s -> CHANGE', file=out)
+    for canid, rone, rtwo in result['rates']:
+        print('\t%s -> %.2f -> %.2f -> %+.1f%%' % (fmt(canid), rone, rtwo, (rtwo - rone) / rone * 100), file=out)
+    print('CAN codes payload Bytes distribution changes:', file=out)
+    print('\tCOD -> BYTE -> TVD -> MODE -> MODE', file=out)
+    for canid, byte, tvd, mone, mtwo in result['bytes']:
+        print('\t%s -> %s -> %.2f -> %02X -> %02X' % (fmt(canid), byte, tvd, mone, mtwo), file=out)
+
+
+def main(argv=None):
+    """ Command line wrapper of the diff engine """
+    parser = argparse.ArgumentParser(description='Compare two Socketcan CAN Bus dump files by CAN ID, rate and payload.')
+    parser.add_argument('reference', help='reference Socketcan dump file (e.g. the "car on" recording)')
+    parser.add_argument('other', help='Socketcan dump file to compare (e.g. the "conversion kit" recording)')
+    parser.add_argument('-r', '--rate-threshold', type=float, default=RATE_THRESHOLD,
+                        help='minimum relative rate change to report (default: %s)' % RATE_THRESHOLD)
+    parser.add_argument('-t', '--tvd-threshold', type=float, default=TVD_THRESHOLD,
+                        help='minimum Byte distribution change to report (default: %s)' % TVD_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    result = diff(summarize(sccache.load(args.reference)), summarize(sccache.load(args.other)),
+                  args.rate_threshold, args.tvd_threshold)
+    print_diff(result)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
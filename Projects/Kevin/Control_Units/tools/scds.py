@@ -1,13 +1,61 @@
-#!/usr/bin/env python3.5
+#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """ This is scds.py (Socketcan Display Statistics) script to show statistics data of CAN Bus dump files in Socketcan dump file format.
 
 This file is a temporary script for test & debug.
 
 In this version we implemented a simple script to compute statistics on a Socketcan dump
-file format to help reverse engineering CAN Bus messages of an unknown vendor. Input file
-must be under the same directory of this script and it must be named 'inputfile.dump'.
-This script output is redirected to the standard output.
+file format to help reverse engineering CAN Bus messages of an unknown vendor. The input
+file is read only once: events, DLCs, first/last timestamps and payload lenght changes
+of every CAN ID are collected together in a single streaming pass. The statistics engine
+can be imported by other tools (see 'scds_file()' and 'scds_lines()'), while the command
+line wrapper prints the report on the standard output:
+
+    python3 scds.py [--workers N] [--sketch] [--timing] [--bits [--export FILE]] [inputfile.dump]
+    python3 scds.py --follow [--window S] [--refresh S] [inputfile.dump | --bus CHANNEL]
+
+With '--workers' the input file is memory-mapped and split on row boundaries into chunks
+that a pool of processes parses in parallel: the partial statistics of every chunk are
+then merged (in file order) into the same report the serial pass prints.
+
+With '--sketch' the report also shows, for every CAN ID, the approximate number of distinct
+payloads and the most frequent ones, computed with fixed memory per CAN ID (about 9.5 KB)
+however long the recording is (see 'PayloadSketch'):
+
+- distinct payloads are counted with a HyperLogLog of 2^SKETCH_PRECISION registers: the
+  relative standard error is 1.04 / sqrt(2^SKETCH_PRECISION), i.e. 3.25% with the default
+  precision of 10 (counts below 2.5 x 2^SKETCH_PRECISION are nearly exact, since linear
+  counting is used for them);
+- payload frequencies are estimated with a count-min sketch of SKETCH_DEPTH rows of
+  SKETCH_WIDTH counters: an estimate is never lower than the real count and it exceeds it
+  by at most e / SKETCH_WIDTH of the CAN ID frames (1.06%) with probability
+  1 - e^-SKETCH_DEPTH (98.2%);
+- the SKETCH_TOP payloads with the highest estimates are kept as heavy hitters.
+
+With '--timing' the cycle time of every CAN ID (on every channel) is analysed instead:
+median period, min/max, 5th/95th percentiles, jitter (standard deviation of the period)
+and the number of gaps (periods longer than GAP_FACTOR times the median, e.g. dropouts)
+and bursts (periods shorter than BURST_FACTOR times the median). The analysis runs with
+NumPy on the columnar cache of the dump file (see sccache.py), so it requires NumPy.
+
+With '--bits' the payload bits activity of every CAN ID is analysed: payloads are unpacked
+into bit matrices (in blocks of BITS_BLOCK frames, so memory does not grow with the dump
+file) and for every bit position the number of toggles between consecutive frames, the
+entropy and whether the bit is constant are reported. The console map shows one char per
+bit (bit 7 to bit 0 of Byte 0 to the DLC): '.' is a constant bit, 0-9 is the entropy x 10.
+With '--export FILE' the whole table is also written as CSV (one row per bit position),
+ready to be plotted as a heatmap.
+
+With '--follow' the statistics are updated while 'candump -l' is still writing the input
+file (or, with '--bus', while frames are received from a python-can Bus): for every CAN ID
+the console shows the events, the rate and the payload changes rate over a sliding time
+window, refreshed every '--refresh' seconds. The window is kept as a ring of WINDOW_BUCKETS
+counters per CAN ID, so memory does not grow however long the script runs and old data is
+never scanned again.
+
+Input files can be gzip, bz2 or xz compressed (see scio.py): they are decompressed while
+they are read. Compressed files are always parsed by a single process.
+
 Output of this script is:
 
 Unique CAN codes: #ofUniqueCAN_IDs
@@ -16,11 +64,46 @@ UniqueCAN_ID_count_id -> UniqueCAN_ID -> #ofEvents_in_dump_file
 ...
 CAN ID => Payload #ofPositions (#ofBytes Byte(s))
 ...
+CAN ID -> DLCs -> first timestamp -> last timestamp
+...
 
 =========================================================================================
 
 Versions history:
 
+v.0.7.2 (20261017):
+- the payload sketches hash with blake2b again: the tools require Python 3.9 (see README.txt).
+
+v.0.7.1 (20261017):
+- the payload sketches hash with SHA-1 (blake2b needs Python 3.6).
+- parallel workers read their chunk one row at a time and chunks are at most CHUNK_SIZE
+  Bytes, so the memory of every worker does not grow with the size of the input file.
+
+v.0.7.0 (20261017):
+- added the '--sketch' option to report approximate distinct and most frequent payloads.
+
+v.0.6.0 (20261017):
+- added the support of gzip, bz2 and xz compressed input files.
+
+v.0.5.0 (20261017):
+- added the '--follow' mode to show rolling statistics of a growing file or a live bus.
+
+v.0.4.0 (20261017):
+- added the '--bits' and '--export' options to analyse payload bits activity and entropy.
+
+v.0.3.0 (20261017):
+- added the '--timing' option to analyse CAN IDs cycle times, jitter and gaps.
+
+v.0.2.0 (20261017):
+- added the '--workers' option to parse large dump files on multiple cores.
+
+v.0.1.0 (20261017):
+- rebuilt the script as a single streaming pass over the input file (it was scanning
+  the whole file once more for every unique CAN ID).
+- added per CAN ID DLC sets and first/last timestamps to the output.
+- the statistics engine is now importable and the input file name is a command line
+  argument (default is still 'inputfile.dump').
+
 v.0.0.1 (20180222):
 - added the INPUT_FILE global variable to make easy changing input file name.
 - added some comments to make clear code understanding.
@@ -32,7 +115,7 @@ v.0.0.0 (20180221):
 
 This script can be improved a lot!"""
 
-__version__    =  "0.0.1"
+__version__    =  "0.7.2"
 
 __author__     =  "Valerio Vannucci"
 __copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
@@ -43,57 +126,637 @@ __email__      =  "valerio.vannucci@iaiagi.com"
 __status__     =  "Prototype"
 
 # Import statements here
+import os                                                      # Operating system (CPU count) management
+import sys                                                     # Standard output and command line management
+import mmap                                                    # Memory-mapped file management
+import csv                                                     # CSV export management
+import math                                                    # Sketches estimates
+import time                                                    # Time management
+import array                                                   # Compact arrays of counters
+import hashlib                                                 # Payloads hashing for the sketches
+import argparse                                                # Command line arguments management
 import collections                                             # Specialized data types management
+import multiprocessing                                         # Process pool management
 
+import scio                                                    # Plain and compressed dump files I/O
 
-# Custom functions here
-# def custom_function():
-#     pass
+# Global variables here
+INPUT_FILE = 'inputfile.dump'                                  # Default CAN Bus dump file name if none is given on the command line
+CHUNKS_PER_WORKER = 4                                          # Number of chunks the input is split into for every parallel worker
+CHUNK_SIZE = 16 << 20                                          # Maximum chunk size in Bytes (larger files get more chunks)
+GAP_FACTOR = 2.0                                               # A period longer than GAP_FACTOR x median period is a gap
+BURST_FACTOR = 0.5                                             # A period shorter than BURST_FACTOR x median period is a burst
+BITS_BLOCK = 1 << 18                                           # Frames unpacked into bit matrices at once by the bits analysis
+WINDOW_BUCKETS = 20                                            # Counters of the sliding time window of the follow mode
+FOLLOW_POLL = 0.05                                             # Seconds to wait for new rows of a growing file
+SKETCH_PRECISION = 10                                          # HyperLogLog registers are 2^SKETCH_PRECISION
+SKETCH_WIDTH = 256                                             # Counters of every row of the count-min sketch (a power of 2)
+SKETCH_DEPTH = 4                                               # Rows of the count-min sketch
+SKETCH_TOP = 10                                                # Most frequent payloads kept for every CAN ID
 
-# Start of input and output file processing here
-INPUT_FILE = 'inputfile.dump'                                  # Set here the CAN Bus dump file name if different from default 'inputfile.dump'
 
-file = open(INPUT_FILE)                                        # Start processing the input file which must be under the same
-                                                               # directory of this Python script
-# Global variables here
-inputlist = []                                                 # Set the list that will contain the input items
-allcodes = []                                                  # Set the list that will contain all the unique detected CAN IDs
+# Payloads hash here
+def _payload_hash(payload):
+    """ Return the 64 bits hash of a payload """
+    return int.from_bytes(hashlib.blake2b(payload.encode(), digest_size=8).digest(), 'little')
+
+
+# Custom classes here
+class PayloadSketch(object):
+    """ Approximate distinct payloads (HyperLogLog) and most frequent payloads (count-min sketch) in fixed memory """
+
+    __slots__ = ('registers', 'counters', 'top', '_floor', '_payload', '_hash')
+
+    def __init__(self):
+        self.registers = bytearray(1 << SKETCH_PRECISION)      # HyperLogLog registers
+        self.counters = array.array('Q', bytes(8 * SKETCH_WIDTH * SKETCH_DEPTH))   # Count-min sketch rows, one after the other
+        self.top = {}                                          # Heavy hitters: payload -> estimated frames
+        self._floor = 0                                        # Lowest estimate among the heavy hitters
+        self._payload = None                                   # Last payload and its hash: payloads often repeat
+        self._hash = 0
+
+    def add(self, payload):
+        """ Account one payload (as written in the dump file) """
+        if payload != self._payload:
+            self._payload = payload
+            self._hash = _payload_hash(payload)
+            rest = self._hash & ((1 << (64 - SKETCH_PRECISION)) - 1)
+            rank = 64 - SKETCH_PRECISION - rest.bit_length() + 1
+            index = self._hash >> (64 - SKETCH_PRECISION)
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+        estimate = self._count(self._hash, 1)
+        self._track(payload, estimate)
+
+    def _count(self, value, increment):
+        """ Add 'increment' to the count-min sketch cells of a hash and return the new estimate """
+        bits = SKETCH_WIDTH.bit_length() - 1                   # Every row takes its own bits of the hash
+        estimate = None
+        for row in range(SKETCH_DEPTH):
+            cell = row * SKETCH_WIDTH + ((value >> (row * bits)) & (SKETCH_WIDTH - 1))
+            self.counters[cell] += increment
+            if estimate is None or self.counters[cell] < estimate:
+                estimate = self.counters[cell]
+        return estimate
+
+    def _track(self, payload, estimate):
+        """ Keep 'payload' among the heavy hitters if its estimate is high enough """
+        if payload in self.top or len(self.top) < SKETCH_TOP:
+            self.top[payload] = estimate
+        elif estimate > self._floor:
+            lowest = min(self.top, key=self.top.get)
+            self._floor = self.top[lowest]
+            if estimate > self._floor:
+                del self.top[lowest]
+                self.top[payload] = estimate
+                self._floor = min(self.top.values())
+
+    def merge(self, other):
+        """ Account the payloads of another sketch (e.g. of a following part of the dump file) """
+        for index, rank in enumerate(other.registers):
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+        for cell, count in enumerate(other.counters):
+            self.counters[cell] += count
+        for payload in list(self.top) + list(other.top):       # Estimates are taken again on the merged counters
+            value = _payload_hash(payload)
+            self._track(payload, self._count(value, 0))
+        self._payload = None
 
-for line in file:                                              # Start processing the input file one row at a time
+    def distinct(self):
+        """ Return the estimated number of distinct payloads """
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:                   # Small range correction (linear counting)
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+    def most_common(self):
+        """ Return the heavy hitters as a list of (payload, estimated frames), most frequent first """
+        return sorted(self.top.items(), key=lambda item: (-item[1], item[0]))
+
+
+class CanIdStats(object):
+    """ Statistics collected for a single CAN ID while streaming a Socketcan dump file """
+
+    __slots__ = ('cancode', 'events', 'dlcs', 'first', 'last', 'lengths', '_curlen', 'sketch')
+
+    def __init__(self, cancode, sketch=False):
+        self.cancode = cancode                                 # CAN ID as written in the dump file (e.g. '201')
+        self.events = 0                                        # Number of frames of this CAN ID
+        self.dlcs = set()                                      # Set of the detected payload lenghts in Bytes
+        self.first = None                                      # Timestamp of the first frame (string as in the dump file)
+        self.last = None                                       # Timestamp of the last frame (string as in the dump file)
+        self.lengths = []                                      # Payload lenght (in characters) every time it changes
+        self._curlen = 0                                       # Payload lenght of the last frame (0 = no frame yet)
+        self.sketch = PayloadSketch() if sketch else None      # Approximate payloads statistics, if requested
+
+    def add(self, timestamp, payload):
+        """ Account one frame of this CAN ID """
+        self.events += 1
+        if self.first is None:
+            self.first = timestamp
+        self.last = timestamp
+        lnt = len(payload)                                     # 'lnt' is the number of characters that makes up the payload
+        if lnt != self._curlen:                                # Trace payload lenght changes in the same order they happen
+            self._curlen = lnt
+            self.lengths.append(lnt)
+            self.dlcs.add(lnt // 2)
+        if self.sketch is not None:
+            self.sketch.add(payload)
+
+    def merge(self, other):
+        """ Account the statistics of a following part of the same dump file """
+        self.events += other.events
+        if self.first is None:
+            self.first = other.first
+        if other.last is not None:
+            self.last = other.last
+        lengths = other.lengths
+        if lengths and lengths[0] == self._curlen:             # Not a change if the previous part ended with the same lenght
+            lengths = lengths[1:]
+        self.lengths.extend(lengths)
+        self.dlcs.update(other.dlcs)
+        if other.events:
+            self._curlen = other._curlen
+        if other.sketch is not None:
+            if self.sketch is None:
+                self.sketch = other.sketch
+            else:
+                self.sketch.merge(other.sketch)
+
+
+class RollingIdStats(object):
+    """ Rolling statistics of a single CAN ID over a sliding time window (fixed memory) """
+
+    __slots__ = ('cancode', 'events', 'payload', 'slot', 'frames', 'changes')
+
+    def __init__(self, cancode, buckets):
+        self.cancode = cancode                                 # CAN ID as written in the dump file (e.g. '201')
+        self.events = 0                                        # Number of frames since the start
+        self.payload = None                                    # Last payload
+        self.slot = None                                       # Time slot of the most recent bucket
+        self.frames = [0] * buckets                            # Frames in every bucket of the window
+        self.changes = [0] * buckets                           # Payload changes in every bucket of the window
+
+    def advance(self, slot):
+        """ Move the window forward to time slot 'slot', clearing the buckets left behind """
+        if self.slot is None or slot - self.slot >= len(self.frames):
+            for index in range(len(self.frames)):
+                self.frames[index] = self.changes[index] = 0
+        else:
+            for old in range(self.slot + 1, slot + 1):
+                index = old % len(self.frames)
+                self.frames[index] = self.changes[index] = 0
+        if self.slot is None or slot > self.slot:
+            self.slot = slot
+
+
+class RollingStats(object):
+    """ Rolling statistics of every CAN ID over a sliding time window of 'window' seconds """
+
+    def __init__(self, window, buckets=WINDOW_BUCKETS):
+        self.window = window
+        self.buckets = buckets
+        self.width = window / buckets                          # Seconds covered by every bucket
+        self.now = 0.0                                         # Current time of the window
+        self.last = 0.0                                        # Most recent timestamp seen
+        self.ids = collections.OrderedDict()                   # CAN ID -> RollingIdStats
+
+    def add(self, timestamp, cancode, payload):
+        """ Account one frame (timestamps in seconds) """
+        if timestamp > self.last:
+            self.last = self.now = timestamp
+        entry = self.ids.get(cancode)
+        if entry is None:                                      # First time this CAN ID is detected
+            entry = self.ids[cancode] = RollingIdStats(cancode, self.buckets)
+        slot = int(timestamp / self.width)
+        entry.advance(slot)
+        if slot + self.buckets <= entry.slot:                  # Too old for the window (out of order frame)
+            return
+        index = slot % self.buckets
+        entry.events += 1
+        entry.frames[index] += 1
+        if entry.payload is not None and payload != entry.payload:
+            entry.changes[index] += 1
+        entry.payload = payload
+
+    def idle(self, elapsed):
+        """ Move the window forward when no frames are received for 'elapsed' seconds """
+        self.now = max(self.now, self.last + elapsed)
+
+    def snapshot(self):
+        """ Return a list of (CAN ID, events, frames/s, changes/s, last payload) at the current time """
+        slot = int(self.now / self.width)
+        rows = []
+        for entry in self.ids.values():
+            entry.advance(slot)
+            rows.append((entry.cancode, entry.events, sum(entry.frames) / self.window,
+                         sum(entry.changes) / self.window, entry.payload))
+        return rows
+
+
+# Custom functions here
+def parse_line(line):
+    """ Split a Socketcan dump file row into (timestamp, channel, CAN ID, payload)
+
+    The timestamp is returned without its round brackets. None is returned for rows
+    that cannot be processed (e.g. empty rows). """
     inputlist = line.split()                                   # Dissecting each line into its single components
-    cancode, payload = inputlist[2].split('#')                 # Discriminate the CAN ID from its payload
-    allcodes.append(cancode)                                   # Add the CAN ID at the end of 'allcodes' list
-
-file.close()                                                   # Close the input file I/O activity
-
-unique_cancodes = set(allcodes)                                # Generate a set containing only the detected unique CAN IDs
-counter = collections.Counter()                                # Initialize a Counter collection to count events for each unique CAN IDs
-for code in allcodes:                                          # Scan all detected CAN IDs
-    counter[code] += 1 										   # Adds one unit to each CAN ID matching events
-
-print('Unique CAN codes: ', len(unique_cancodes))              # Print out the number of unique detected CAN IDs
-print('Unique CAN codes events:')                              # Print out description header
-print('\tID -> COD -> EVTs')                                   # Print out statistical data columns header
-l = 1                                                          # Formats the output in order to make columns value aligned by column
-for key in counter:                                            # Output format is:
-    if l < 10:                                                 # Unique CAN codes: #ofUniqueCAN_IDs
-        print('\t %s -> %s -> %s' %(l, key, counter[key]))     # ID -> COD -> EVTs
-    else:                                                      # UniqueCAN_ID_count_id -> UniqueCAN_ID -> #ofEvents_in_dump_file
-        print('\t%s -> %s -> %s' %(l, key, counter[key]))      # ...
-    l += 1
-
-for item in counter:                                           # Start evaluating how many bytes is each CAN IDs payload
-    tmplen = 0                                                 # Output format is:
-    file = open(INPUT_FILE)                                    # CAN ID => Payload #ofPositions (#ofBytes Byte(s))
-    for line in file:                                          # ...
-        inputlist = line.split()
-        cancode, payload = inputlist[2].split('#')             # Discriminate CAN IDs from their payload
-        if item == cancode:
-            lnt = len(payload)                                 # 'len' is the number of characters that makes up the payload
-            if lnt != tmplen:
-                tmplen = lnt                                   # 'tmplen' contains the number of characters that symbolize payload lenght
-                print('\t%s => %s (%s Byte(s))' %(item, tmplen, int(tmplen / 2)))
-
-    file.close()                                               # Close the input file I/O activity (see line 73 of this file)
+    if len(inputlist) < 3:
+        return None
+    cancode, sep, payload = inputlist[2].partition('#')        # Discriminate the CAN ID from its payload
+    if not sep:
+        return None
+    return inputlist[0].strip('()'), inputlist[1], cancode, payload
+
+
+def scds_lines(lines, sketch=False):
+    """ Compute the statistics of an iterable of Socketcan dump file rows in a single pass
+
+    Returns an OrderedDict CAN ID -> CanIdStats, in order of first appearance. With
+    'sketch' the approximate payloads statistics are computed too (see PayloadSketch). """
+    stats = collections.OrderedDict()
+    for line in lines:                                         # Start processing the input one row at a time
+        item = parse_line(line)
+        if item is None:                                       # Skip rows with no meaningful data
+            continue
+        timestamp, canbus, cancode, payload = item
+        entry = stats.get(cancode)
+        if entry is None:                                      # First time this CAN ID is detected
+            entry = stats[cancode] = CanIdStats(cancode, sketch)
+        entry.add(timestamp, payload)
+    return stats
+
+
+def merge_stats(stats, partial):
+    """ Merge the statistics of a following part of the dump file into 'stats' """
+    for cancode, other in partial.items():
+        entry = stats.get(cancode)
+        if entry is None:
+            stats[cancode] = other
+        else:
+            entry.merge(other)
+    return stats
+
+
+def split_chunks(buf, nchunks):
+    """ Return the (start, end) offsets of up to 'nchunks' parts of 'buf' split on row boundaries """
+    size = len(buf)
+    bounds = [0]
+    for index in range(1, nchunks):
+        offset = buf.find(b'\n', max(size * index // nchunks, bounds[-1]))
+        if offset < 0:                                         # No more rows left to split
+            break
+        bounds.append(offset + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _mmap_lines(buf, start, end):
+    """ Yield the rows of the part of a memory-mapped dump file between 'start' and 'end' (row aligned) """
+    buf.seek(start)
+    while buf.tell() < end:
+        yield buf.readline().decode('ascii', 'replace')
+
+
+def _scds_chunk(args):
+    """ Process pool worker: compute the statistics of a part of a dump file, one row at a time """
+    filename, start, end, sketch = args
+    with open(filename, 'rb') as inputfile:
+        with mmap.mmap(inputfile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return scds_lines(_mmap_lines(buf, start, end), sketch)
+
+
+def scds_file(filename, workers=1, sketch=False):
+    """ Compute the statistics of a Socketcan dump file (see 'scds_lines()')
+
+    With 'workers' > 1 the file is parsed in parallel by a pool of processes
+    ('workers' = 0 uses all the available CPUs). Compressed files are read by a single
+    process, since they cannot be split without decompressing them. """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers == 1 or os.path.getsize(filename) == 0 or scio.is_compressed(filename):
+        with scio.open_input(filename) as inputfile:
+            return scds_lines(inputfile, sketch)
+
+    with open(filename, 'rb') as inputfile:
+        with mmap.mmap(inputfile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            chunks = split_chunks(buf, max(workers * CHUNKS_PER_WORKER, -(-len(buf) // CHUNK_SIZE)))
+
+    stats = collections.OrderedDict()
+    with multiprocessing.Pool(workers) as pool:                # Partial results come back in file order
+        for partial in pool.imap(_scds_chunk, [(filename, start, end, sketch) for start, end in chunks]):
+            merge_stats(stats, partial)
+    return stats
+
+
+def print_report(stats, out=sys.stdout):
+    """ Print out the statistics report in the historical scds format """
+    print('Unique CAN codes: ', len(stats), file=out)          # Print out the number of unique detected CAN IDs
+    print('Unique CAN codes events:', file=out)                # Print out description header
+    print('\tID -> COD -> EVTs', file=out)                     # Print out statistical data columns header
+    for l, key in enumerate(stats, 1):                         # Formats the output in order to make columns value aligned by column
+        if l < 10:
+            print('\t %s -> %s -> %s' % (l, key, stats[key].events), file=out)
+        else:
+            print('\t%s -> %s -> %s' % (l, key, stats[key].events), file=out)
+
+    for key in stats:                                          # How many bytes is each CAN IDs payload
+        for tmplen in stats[key].lengths:
+            print('\t%s => %s (%s Byte(s))' % (key, tmplen, int(tmplen / 2)), file=out)
+
+    print('CAN codes DLCs and timestamps:', file=out)
+    print('\tCOD -> DLCs -> FIRST -> LAST', file=out)
+    for key in stats:
+        entry = stats[key]
+        dlcs = ','.join(str(dlc) for dlc in sorted(entry.dlcs))
+        print('\t%s -> %s -> %s -> %s' % (key, dlcs, entry.first, entry.last), file=out)
+
+    if any(entry.sketch is not None for entry in stats.values()):
+        print('CAN codes distinct payloads (approximate):', file=out)
+        print('\tCOD -> DISTINCT -> TOP PAYLOADS:EVTs', file=out)
+        for key in stats:
+            sketch = stats[key].sketch
+            top = ' '.join('%s:%s' % (payload or '-', count) for payload, count in sketch.most_common())
+            print('\t%s -> ~%s -> %s' % (key, sketch.distinct(), top), file=out)
+
+
+def group_frames(frames):
+    """ Group columnar CAN frames (see sccache.py) by channel and CAN ID, sorted by timestamp
+
+    Returns (order, key, starts): 'order' are the frame indexes grouped and sorted, 'key'
+    is the (channel << 32 | CAN ID) of every frame in 'order' and 'starts' are the offsets
+    in 'order' where every group starts. """
+    import numpy as np                                         # Only the columnar analysis requires NumPy
+
+    key = (frames.chan.astype(np.int64) << 32) | frames.id.astype(np.int64)
+    order = np.lexsort((frames.ts, key))                       # Group by channel and CAN ID, then sort by time
+    key = key[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.zeros(0, dtype=np.int64)
+    return order, key, starts
+
+
+def timing_stats(frames, gap_factor=GAP_FACTOR, burst_factor=BURST_FACTOR):
+    """ Compute the cycle time statistics of every CAN ID of columnar CAN frames (see sccache.py)
+
+    Frames are grouped by channel and CAN ID and sorted by timestamp, then all the groups
+    are processed together with NumPy: no Python loop runs over frames or groups. Returns
+    a dict of NumPy arrays with one item per (channel, CAN ID) that has at least 2 frames;
+    times are in microseconds. """
+    import numpy as np                                         # Only the columnar analysis requires NumPy
+
+    order, key, _ = group_frames(frames)
+    ts = frames.ts[order]
+
+    period = np.diff(ts)
+    same = key[1:] == key[:-1]                                 # Periods between frames of the same group only
+    period = period[same]
+    group = key[1:][same]
+    if len(period) == 0:
+        return None
+
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    counts = np.diff(np.r_[starts, len(period)])
+    gkey = group[starts]
+
+    srt = period[np.lexsort((period, np.repeat(np.arange(len(starts)), counts)))]
+
+    def percentile(q):
+        return srt[starts + np.round(q * (counts - 1)).astype(np.int64)]
+
+    median = percentile(0.5)
+    mean = np.add.reduceat(period, starts) / counts
+    sqmean = np.add.reduceat(period.astype(np.float64) ** 2, starts) / counts
+    median_rep = np.repeat(median, counts)
+
+    return {
+        'chan': (gkey >> 32).astype(np.uint8),
+        'id': (gkey & 0xFFFFFFFF).astype(np.uint32),
+        'frames': counts + 1,
+        'median': median,
+        'min': np.minimum.reduceat(period, starts),
+        'p5': percentile(0.05),
+        'p95': percentile(0.95),
+        'max': np.maximum.reduceat(period, starts),
+        'jitter': np.sqrt(np.maximum(sqmean - mean ** 2, 0.0)),
+        'gaps': np.add.reduceat((period > gap_factor * median_rep).astype(np.int64), starts),
+        'bursts': np.add.reduceat((period < burst_factor * median_rep).astype(np.int64), starts),
+    }
+
+
+def print_timing(timing, channels, out=sys.stdout):
+    """ Print out the cycle time statistics (times in milliseconds) """
+    from sccache import format_canid
+
+    print('CAN codes cycle times (ms):', file=out)
+    print('	CHN COD -> EVTs -> MEDIAN MIN P5 P95 MAX -> JITTER -> GAPS BURSTS', file=out)
+    if timing is None:
+        return
+    for index in range(len(timing['id'])):
+        print('	%s %s -> %s -> %.3f %.3f %.3f %.3f %.3f -> %.3f -> %s %s' % (
+            channels[timing['chan'][index]], format_canid(timing['id'][index]), timing['frames'][index],
+            timing['median'][index] / 1000.0, timing['min'][index] / 1000.0, timing['p5'][index] / 1000.0,
+            timing['p95'][index] / 1000.0, timing['max'][index] / 1000.0, timing['jitter'][index] / 1000.0,
+            timing['gaps'][index], timing['bursts'][index]), file=out)
+
+
+def bit_stats(frames, block=BITS_BLOCK):
+    """ Compute the payload bits activity of every CAN ID of columnar CAN frames (see sccache.py)
+
+    Returns a dict of NumPy arrays with one item per (channel, CAN ID); per bit arrays have
+    64 columns, bit position 8 x Byte + (7 - bit) (the 'numpy.unpackbits' order). """
+    import numpy as np                                         # Only the columnar analysis requires NumPy
+
+    order, key, starts = group_frames(frames)
+    ends = np.r_[starts[1:], len(order)].astype(np.int64)
+    ones = np.zeros((len(starts), 64), dtype=np.int64)         # Frames with every bit set
+    toggles = np.zeros((len(starts), 64), dtype=np.int64)      # Bit changes between consecutive frames
+    dlc = np.zeros(len(starts), dtype=np.uint8)
+    first = np.zeros((len(starts), 8), dtype=np.uint8)
+
+    for group, (start, end) in enumerate(zip(starts, ends)):   # One loop step per CAN ID and per block of frames
+        prev = None
+        for offset in range(start, end, block):
+            data = np.asarray(frames.data[order[offset:min(offset + block, end)]])
+            ones[group] += np.unpackbits(data, axis=1).sum(axis=0, dtype=np.int64)
+            if prev is not None:
+                data = np.concatenate((prev, data))
+            toggles[group] += np.unpackbits(data[1:] ^ data[:-1], axis=1).sum(axis=0, dtype=np.int64)
+            prev = data[-1:]
+        dlc[group] = frames.dlc[order[start:end]].max()
+        first[group] = frames.data[order[start]]
+
+    counts = ends - starts
+    prob = ones / counts[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = 0.0 - np.nan_to_num(prob * np.log2(prob)) - np.nan_to_num((1 - prob) * np.log2(1 - prob))
+    mask = np.packbits(toggles == 0, axis=1)                   # Constant bits mask, as 8 Bytes
+
+    return {
+        'chan': (key[starts] >> 32).astype(np.uint8),
+        'id': (key[starts] & 0xFFFFFFFF).astype(np.uint32),
+        'frames': counts,
+        'dlc': dlc,
+        'ones': ones,
+        'toggles': toggles,
+        'entropy': entropy,
+        'const_mask': mask,
+        'const_value': first & mask,
+    }
+
+
+def bits_map(bits, index):
+    """ Return the console map of the payload bits of an item of 'bit_stats()' """
+    chars = []
+    for byte in range(int(bits['dlc'][index])):
+        chars.append(''.join('.' if bits['toggles'][index, pos] == 0 else str(min(9, int(bits['entropy'][index, pos] * 10)))
+                             for pos in range(byte * 8, byte * 8 + 8)))
+    return ' '.join(chars) or '-'
+
+
+def print_bits(bits, channels, out=sys.stdout):
+    """ Print out the payload bits activity ('.' = constant bit, 0-9 = entropy x 10) """
+    from sccache import format_canid
+
+    print('CAN codes payload bits activity:', file=out)
+    print('\tCHN COD -> EVTs -> CONST MASK -> CONST VALUE -> BITS MAP', file=out)
+    for index in range(len(bits['id'])):
+        print('\t%s %s -> %s -> %s -> %s -> %s' % (
+            channels[bits['chan'][index]], format_canid(bits['id'][index]), bits['frames'][index],
+            bytes(bits['const_mask'][index]).hex().upper(), bytes(bits['const_value'][index]).hex().upper(),
+            bits_map(bits, index)), file=out)
+
+
+def export_bits(bits, channels, filename):
+    """ Write the payload bits activity as CSV, one row per CAN ID and bit position """
+    from sccache import format_canid
+
+    with open(filename, 'w', newline='') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(['channel', 'canid', 'byte', 'bit', 'frames', 'ones', 'toggles', 'entropy', 'constant'])
+        for index in range(len(bits['id'])):
+            channel = channels[bits['chan'][index]]
+            canid = format_canid(bits['id'][index])
+            for pos in range(64):
+                writer.writerow([channel, canid, pos // 8, 7 - pos % 8, bits['frames'][index], bits['ones'][index, pos],
+                                 bits['toggles'][index, pos], '%.4f' % bits['entropy'][index, pos],
+                                 int(bits['toggles'][index, pos] == 0)])
+
+
+def follow_file(filename, poll=FOLLOW_POLL):
+    """ Yield (timestamp, CAN ID, payload) of the rows of a growing dump file, None when idle """
+    with open(filename) as inputfile:
+        partial = ''
+        while True:
+            line = inputfile.readline()
+            if not line:
+                if os.path.getsize(filename) < inputfile.tell():   # File truncated (e.g. a new recording)
+                    inputfile.seek(0)
+                    partial = ''
+                yield None
+                time.sleep(poll)
+                continue
+            line = partial + line
+            if not line.endswith('\n'):                        # Row still being written
+                partial = line
+                continue
+            partial = ''
+            item = parse_line(line)
+            if item is not None:
+                yield float(item[0]), item[2], item[3]
+
+
+def follow_bus(channel, interface='socketcan', poll=FOLLOW_POLL):
+    """ Yield (timestamp, CAN ID, payload) of the frames received from a python-can Bus, None when idle """
+    import can                                                 # Only the bus follow mode requires python-can
+
+    bus = can.interface.Bus(channel=channel, interface=interface)
+    try:
+        while True:
+            msg = bus.recv(poll)
+            if msg is None:
+                yield None
+            else:
+                yield (msg.timestamp, ('%08X' if msg.is_extended_id else '%03X') % msg.arbitration_id,
+                       bytes(msg.data).hex().upper())
+    finally:
+        bus.shutdown()
+
+
+def print_rolling(stats, out=sys.stdout):
+    """ Print out the rolling statistics, clearing the console first """
+    out.write('\x1b[H\x1b[2J')
+    print('Unique CAN codes: ', len(stats.ids), file=out)
+    print('Rolling window: %ss' % stats.window, file=out)
+    print('\tCOD -> EVTs -> RATE/s -> CHANGES/s -> PAYLOAD', file=out)
+    for cancode, events, rate, changes, payload in stats.snapshot():
+        print('\t%s -> %s -> %.1f -> %.1f -> %s' % (cancode, events, rate, changes, payload), file=out)
+    out.flush()
+
+
+def follow(source, window, refresh, out=sys.stdout):
+    """ Update and print out the rolling statistics of 'source' (see 'follow_file()') forever """
+    stats = RollingStats(window)
+    deadline = received = time.monotonic()
+    for item in source:
+        if item is not None:
+            stats.add(*item)
+            received = time.monotonic()
+        else:                                                  # The bus is quiet: rates must go down anyway
+            stats.idle(time.monotonic() - received)
+        if time.monotonic() >= deadline:                       # Refresh at a fixed rate, whatever the bus load
+            print_rolling(stats, out)
+            deadline = time.monotonic() + refresh
+
+
+def main(argv=None):
+    """ Command line wrapper of the statistics engine """
+    parser = argparse.ArgumentParser(description='Show statistics of a Socketcan CAN Bus dump file.')
+    parser.add_argument('inputfile', nargs='?', default=INPUT_FILE,
+                        help="Socketcan dump file (default: '%s')" % INPUT_FILE)
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of parallel worker processes (0 = all CPUs, default: 1)')
+    parser.add_argument('-s', '--sketch', action='store_true',
+                        help='report approximate distinct and most frequent payloads of every CAN ID')
+    parser.add_argument('-t', '--timing', action='store_true',
+                        help='analyse cycle times, jitter and gaps of every CAN ID (requires NumPy)')
+    parser.add_argument('-b', '--bits', action='store_true',
+                        help='analyse payload bits activity and entropy of every CAN ID (requires NumPy)')
+    parser.add_argument('-e', '--export', metavar='FILE',
+                        help='with --bits, also write the bits activity table as CSV to FILE')
+    parser.add_argument('-f', '--follow', action='store_true',
+                        help='show rolling statistics while the input file grows (stop with Ctrl+C)')
+    parser.add_argument('--bus', metavar='CHANNEL',
+                        help='with --follow, read frames from a python-can socketcan Bus instead of a file')
+    parser.add_argument('--window', type=float, default=10.0,
+                        help='with --follow, sliding time window in seconds (default: 10)')
+    parser.add_argument('--refresh', type=float, default=1.0,
+                        help='with --follow, console refresh period in seconds (default: 1)')
+    args = parser.parse_args(argv)
+
+    if args.follow:
+        source = follow_bus(args.bus) if args.bus else follow_file(args.inputfile)
+        try:
+            follow(source, args.window, args.refresh)
+        except KeyboardInterrupt:
+            pass
+    elif args.timing or args.bits:
+        import sccache
+        frames = sccache.load(args.inputfile)
+        if args.timing:
+            print_timing(timing_stats(frames), frames.channels)
+        if args.bits:
+            bits = bit_stats(frames)
+            print_bits(bits, frames.channels)
+            if args.export:
+                export_bits(bits, frames.channels, args.export)
+    else:
+        print_report(scds_file(args.inputfile, workers=args.workers, sketch=args.sketch))
+    return 0
 
 
+if __name__ == '__main__':
+    sys.exit(main())
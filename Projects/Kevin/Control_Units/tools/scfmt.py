@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" This is scfmt.py (Socketcan Formats) script to convert CAN Bus log files between formats.
+
+This file is a temporary script for test & debug.
+
+Beyond the New Dep and Socketcan dump files we have Vector ASC logs and raw binary logs.
+Instead of one conversion script for every pair of formats, this script keeps a registry
+of formats (FORMATS), each one with a streaming reader and a streaming writer that share
+one compact frame representation, the tuple:
+
+    (timestamp, channel, canid, data)
+
+where 'timestamp' is in Epoch microseconds (int), 'channel' the Socketcan channel name
+(e.g. 'can0'), 'canid' the CAN ID coded as in the SocketCAN API (CAN_EFF_FLAG for
+extended IDs, CAN_RTR_FLAG for remote frames) and 'data' the payload Bytes (for remote
+frames as many zero Bytes as the DLC). Any to any conversion is a single streaming pass
+from a reader to a writer, with no intermediate text:
+
+    python3 scfmt.py [--from FORMAT] [--to FORMAT] [--compression gz|bz2|xz|auto] [--vehicle NAME] source destination
+
+Formats are taken from the file extensions when they are not given. Registered formats:
+
+- socketcan: '(1465912800.000000) can0 201#0366400000000080', the candump '-l' and '-L'
+             log format ('candump-l' is an alias name), extensions '.dump' and '.log';
+- asc:       Vector ASC log ('   0.000416 1  428             Rx   d 4 36 2F 9B D0'), with
+             absolute or relative timestamps and hex or dec CAN IDs, extension '.asc'
+             (ASC channels are numbers: a '// channel N NAME' comment, written before
+             the first frame of every channel, keeps the channel names; without it
+             channel 1 is read as 'can0', 2 as 'can1', ...);
+- newdep:    New Dep dump file (see scconv.py), extension '.txt': rows always carry 8 data
+             Bytes, so payload lenghts are read from the scconv.py table of '--vehicle'
+             (CAN IDs not in the table get DEFAULT_DLC Bytes);
+- binary:    fixed size records, extension '.bin': an 8 Bytes header (BINARY_MAGIC) and
+             24 Bytes little endian records (int64 timestamp, uint32 canid, uint8 DLC,
+             uint8 channel index, 2 padding Bytes, 8 data Bytes). A record with DLC 0xFF
+             declares the name (up to 8 characters, in the data Bytes) of a channel index.
+
+Every input and output file can be gzip, bz2 or xz compressed (see scio.py). Other
+formats can be added with 'register()'. The per format throughput of the readers and of
+the writers is measured on synthetic frames (see scgen.py) with:
+
+    python3 scfmt.py --benchmark [--frames N]
+
+Measurements (200000 frames, 40 CAN IDs, one core):
+
+    format      size (MB)   write (frames/s)    read (frames/s)
+    socketcan   8.4         773000              518000
+    asc         11.5        260000              334000
+    newdep      9.4         256000              477000
+    binary      4.8         3191000             1991000
+
+=========================================================================================
+
+Versions history:
+
+v.0.0.2 (20261017):
+- New Dep rows are written with 8 data Bytes also in the lenght field, as the real
+  recordings; the payload lenghts table of the New Dep reader is '--vehicle'.
+
+v.0.0.1 (20261017):
+- ASC channel names with the same number (e.g. 'can0' and 'vcan0') get different channel
+  numbers, and the names are kept in '// channel N NAME' comments.
+
+v.0.0.0 (20261017):
+- baseline version.
+
+=========================================================================================
+
+This script can be improved a lot!"""
+
+__version__    =  "0.0.2"
+
+__author__     =  "Valerio Vannucci"
+__copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
+__credits__    = ["Valerio Vannucci"]
+__license__    =  "Creative Commons 4.0 International: CC-B-Y-S-A"
+__maintainer__ =  "Valerio Vannucci"
+__email__      =  "valerio.vannucci@iaiagi.com"
+__status__     =  "Prototype"
+
+# Import statements here
+import os                                                      # File system management
+import re                                                      # Channel names management
+import sys                                                     # Standard output and command line management
+import time                                                    # Time management
+import struct                                                  # Binary records management
+import argparse                                                # Command line arguments management
+import tempfile                                                # Benchmark files management
+import collections                                             # Specialized data types management
+from datetime import datetime                                  # Vector ASC header dates management
+
+import scio                                                    # Plain and compressed dump files I/O
+import scgen                                                   # Synthetic frames for the benchmark
+import scconv                                                  # New Dep dump files conventions
+import sccache                                                 # Socketcan timestamps and CAN ID coding
+
+# Global variables here
+CAN_EFF_FLAG = sccache.CAN_EFF_FLAG                            # Extended frame format flag (as in the SocketCAN API)
+CAN_RTR_FLAG = 0x40000000                                      # Remote transmission request flag (as in the SocketCAN API)
+CAN_EFF_MASK = 0x1FFFFFFF                                      # Extended frame format CAN ID bits
+BATCH_ROWS = 4096                                              # Rows (or records) written to the output file at once
+BINARY_MAGIC = b'SCFMT\x00\x01\x00'                            # Binary log header: name and format version
+BINARY_RECORD = struct.Struct('<qIBB2x8s')                     # Binary log record: timestamp, canid, DLC, channel, data
+BINARY_CHANNEL = 0xFF                                          # DLC of the records declaring a channel name
+ASC_DATES = ('%a %b %d %I:%M:%S.%f %p %Y', '%a %b %d %H:%M:%S.%f %Y',
+             '%a %b %d %I:%M:%S %p %Y', '%a %b %d %H:%M:%S %Y')    # Vector ASC header date formats
+BENCHMARK_FRAMES = 200000                                      # Default number of frames of the benchmark
+
+# Custom classes here
+Format = collections.namedtuple('Format', ('reader', 'writer', 'binary', 'extensions'))
+Format.__doc__ = """ A registered log format: reader(stream) yields frames, writer(frames, stream) returns their number """
+
+
+# Custom functions here
+def channel_number(channel):
+    """ Return the number at the end of a channel name (e.g. 1 for 'can1'), None if there is none """
+    match = re.search(r'(\d+)$', channel)
+    return int(match.group(1)) if match else None
+
+
+def _data(text):
+    """ Convert the hex payload of a Socketcan row into Bytes (remote frames: DLC zero Bytes) """
+    if text[:1] == 'R':
+        return bytes(int(text[1:2] or 0))
+    return bytes.fromhex(text)
+
+
+def _count(frames, counter):
+    """ Yield the frames of an iterable, counting them into counter[0] """
+    for frame in frames:
+        counter[0] += 1
+        yield frame
+
+
+def write_batches(rows, frames, outfile):
+    """ Write the text rows (or binary records) made from 'frames' in batches and return the number of frames
+
+    'rows' is a function that formats an iterable of frames. """
+    counter = [0]
+    buf = []
+    for row in rows(_count(frames, counter)):
+        buf.append(row)
+        if len(buf) >= BATCH_ROWS:
+            outfile.write(buf[0][:0].join(buf))              # '' or b'' join
+            buf = []
+    if buf:
+        outfile.write(buf[0][:0].join(buf))
+    return counter[0]
+
+
+def read_socketcan(lines):
+    """ Yield the frames of a Socketcan (candump -l/-L) log """
+    parse = sccache.parse_timestamp
+    for line in lines:
+        inputlist = line.split()
+        if len(inputlist) < 3:                                 # Skip rows with no meaningful data
+            continue
+        cancode, sep, payload = inputlist[2].partition('#')
+        if not sep or payload[:1] == '#':                      # CAN FD frames are not supported
+            continue
+        canid = int(cancode, 16)
+        if len(cancode) > 3:                                   # Socketcan writes extended IDs with 8 digits
+            canid |= CAN_EFF_FLAG
+        if payload[:1] == 'R':
+            canid |= CAN_RTR_FLAG
+        yield parse(inputlist[0].strip('()')), inputlist[1], canid, _data(payload)
+
+
+def _socketcan_rows(frames):
+    """ Format frames as Socketcan log rows """
+    for timestamp, channel, canid, data in frames:
+        if canid & CAN_EFF_FLAG:
+            cancode = '%08X' % (canid & CAN_EFF_MASK)
+        else:
+            cancode = '%03X' % (canid & 0x7FF)
+        payload = ('R%d' % len(data) if data else 'R') if canid & CAN_RTR_FLAG else data.hex().upper()
+        yield '(%d.%06d) %s %s#%s\n' % (timestamp // 1000000, timestamp % 1000000, channel, cancode, payload)
+
+
+def write_socketcan(frames, outfile):
+    """ Write frames as a Socketcan (candump -l/-L) log and return their number """
+    return write_batches(_socketcan_rows, frames, outfile)
+
+
+def _asc_date(text):
+    """ Convert the date of a Vector ASC header into Epoch microseconds (local time), None if it is unknown """
+    for fmt in ASC_DATES:
+        try:
+            return int(round(datetime.strptime(text.strip(), fmt).timestamp() * 1e6))
+        except ValueError:
+            pass
+    return None
+
+
+def read_asc(lines):
+    """ Yield the frames of a Vector ASC log (classic CAN rows only) """
+    parse = sccache.parse_timestamp
+    base = 0                                                   # Epoch of the log start in microseconds
+    hexids = True
+    relative = False
+    timestamp = 0
+    names = {}                                                 # ASC channel number -> channel name (see '_asc_rows()')
+    for line in lines:
+        inputlist = line.split()
+        if len(inputlist) < 5 or not inputlist[1].isdigit():   # Header and event rows
+            if inputlist[:2] == ['//', 'channel'] and len(inputlist) == 4 and inputlist[2].isdigit():
+                names[int(inputlist[2])] = inputlist[3]
+            elif inputlist[:1] == ['date']:
+                base = timestamp = _asc_date(line.strip()[4:]) or 0
+            elif inputlist[:1] == ['base'] and len(inputlist) >= 4:
+                hexids = inputlist[1] == 'hex'
+                relative = inputlist[3] == 'relative'
+            continue
+        kind = inputlist[4]
+        if kind not in ('d', 'r') or inputlist[3] not in ('Rx', 'Tx'):
+            continue                                           # Error frames, statistics and other events
+        cancode = inputlist[2]
+        extended = cancode[-1:] in ('x', 'X')
+        canid = int(cancode.rstrip('xX'), 16 if hexids else 10)
+        if extended:
+            canid |= CAN_EFF_FLAG
+        dlc = int(inputlist[5], 16)
+        if kind == 'r':
+            canid |= CAN_RTR_FLAG
+            data = bytes(dlc)
+        else:
+            data = bytes.fromhex(''.join(inputlist[6:6 + dlc]))
+        timestamp = (timestamp if relative else base) + parse(inputlist[0])
+        number = int(inputlist[1])
+        yield timestamp, names.get(number) or 'can%d' % (number - 1), canid, data
+
+
+def _asc_rows(frames):
+    """ Format frames as Vector ASC log rows, header and footer included """
+    numbers = {}
+    base = None
+    for timestamp, channel, canid, data in frames:
+        if base is None:                                       # The header needs the time of the first frame
+            base = timestamp - timestamp % 1000000
+            date = datetime.fromtimestamp(base // 1000000).strftime('%a %b %d %I:%M:%S.000 %p %Y')
+            yield 'date %s\nbase hex  timestamps absolute\ninternal events logged\n' % date
+            yield 'Begin Triggerblock %s\n' % date
+        number = numbers.get(channel)
+        if number is None:                                     # 'can0' is channel 1, names with no number or a taken one
+            number = channel_number(channel)                   # get the next free one
+            number = number + 1 if number is not None else max(numbers.values() or [0]) + 1
+            while number in numbers.values():
+                number += 1
+            numbers[channel] = number
+            yield '// channel %d %s\n' % (number, channel)    # The channel name, for the way back
+        if canid & CAN_EFF_FLAG:
+            cancode = '%Xx' % (canid & CAN_EFF_MASK)
+        else:
+            cancode = '%X' % (canid & 0x7FF)
+        offset = timestamp - base
+        if canid & CAN_RTR_FLAG:
+            yield '%4d.%06d %d  %-15s Rx   r %X\n' % (offset // 1000000, offset % 1000000, number, cancode, len(data))
+        else:
+            yield '%4d.%06d %d  %-15s Rx   d %X %s\n' % (offset // 1000000, offset % 1000000, number, cancode, len(data),
+                                                      ' '.join('%02X' % value for value in data))
+    if base is not None:
+        yield 'End TriggerBlock\n'
+
+
+def write_asc(frames, outfile):
+    """ Write frames as a Vector ASC log and return their number """
+    return write_batches(_asc_rows, frames, outfile)
+
+
+def read_newdep(lines, lengths=None):
+    """ Yield the frames of a New Dep dump file (payload lenghts and timestamps as scconv.py)
+
+    'lengths' is the payload lenghts table (default: the scconv.py VEHICLE one). """
+    channels = scconv.CHANNELS
+    lengths = scconv.dlc_table() if lengths is None else lengths
+    offset = (scconv.BASE_EPOCH + scconv.RECORDING_START) * 1000000
+    for line in lines:
+        inputlist = line.split()
+        if len(inputlist) < 6 or inputlist[0] not in channels:
+            continue
+        sec, millis, micros = inputlist[1].split(':')
+        canid = int(inputlist[4] + inputlist[5], 16)
+        lenght = lengths.get('%03X' % canid, scconv.DEFAULT_DLC)
+        yield (offset + (int(sec) * 1000 + int(millis)) * 1000 + int(micros), channels[inputlist[0]], canid,
+               bytes.fromhex(''.join(inputlist[6:6 + lenght])))
+
+
+def _newdep_rows(frames):
+    """ Format frames as New Dep dump file rows (always 8 data Bytes, the payload lenght is not kept) """
+    channels = {name: number for number, name in scconv.CHANNELS.items()}
+    offset = (scconv.BASE_EPOCH + scconv.RECORDING_START) * 1000000
+    for timestamp, channel, canid, data in frames:
+        if canid & (CAN_EFF_FLAG | CAN_RTR_FLAG):
+            raise ValueError('New Dep dump files have no extended or remote frames')
+        if channel not in channels:
+            raise ValueError('New Dep dump files have no channel %s' % channel)
+        if timestamp < offset:                                 # Frames before the recording start are relative to the first one
+            offset = timestamp
+        seconds, micros = divmod(timestamp - offset, 1000000)
+        yield '%s %s:%03d:%03d 0 8 %02X %02X %s\n' % (channels[channel], seconds, micros // 1000, micros % 1000,
+                                                     canid >> 8, canid & 0xFF,
+                                                      ' '.join('%02X' % value for value in data.ljust(8, b'\x00')))
+
+
+def write_newdep(frames, outfile):
+    """ Write frames as a New Dep dump file and return their number """
+    return write_batches(_newdep_rows, frames, outfile)
+
+
+def read_binary(stream):
+    """ Yield the frames of a binary log """
+    if stream.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError('Not a binary CAN log')
+    size = BINARY_RECORD.size
+    channels = {}
+    rest = b''
+    while True:
+        block = stream.read(size * BATCH_ROWS)
+        if not block:
+            break
+        block = rest + block
+        end = len(block) - len(block) % size
+        rest = block[end:]
+        for timestamp, canid, dlc, index, data in BINARY_RECORD.iter_unpack(block[:end]):
+            if dlc == BINARY_CHANNEL:
+                channels[index] = data.rstrip(b'\x00').decode('ascii')
+            else:
+                yield timestamp, channels.get(index, 'can%d' % index), canid, data[:dlc]
+
+
+def _binary_records(frames):
+    """ Pack frames as binary log records, declaring the channel names when they first appear """
+    pack = BINARY_RECORD.pack
+    indexes = {}
+    yield BINARY_MAGIC
+    for timestamp, channel, canid, data in frames:
+        index = indexes.get(channel)
+        if index is None:
+            name = channel.encode('ascii')
+            if len(name) > 8 or len(indexes) >= BINARY_CHANNEL:
+                raise ValueError('Too many channels or channel name too long: %s' % channel)
+            index = indexes[channel] = len(indexes)
+            yield pack(0, 0, BINARY_CHANNEL, index, name)
+        yield pack(timestamp, canid, len(data), index, data)
+
+
+def write_binary(frames, outfile):
+    """ Write frames as a binary log and return their number """
+    return write_batches(_binary_records, frames, outfile)
+
+
+FORMATS = collections.OrderedDict()
+
+
+def register(name, reader, writer, binary=False, extensions=()):
+    """ Add a log format to the registry ('extensions' are used to detect the format of the files) """
+    FORMATS[name] = Format(reader, writer, binary, tuple(extensions))
+
+
+register('socketcan', read_socketcan, write_socketcan, extensions=('.dump', '.log'))
+register('candump-l', read_socketcan, write_socketcan)
+register('asc', read_asc, write_asc, extensions=('.asc',))
+register('newdep', read_newdep, write_newdep, extensions=('.txt',))
+register('binary', read_binary, write_binary, binary=True, extensions=('.bin',))
+
+
+def detect_format(filename):
+    """ Return the format of a file from its extension (compression extensions are skipped), None if it is unknown """
+    name = filename
+    if scio.compression_of(name):
+        name = os.path.splitext(name)[0]
+    extension = os.path.splitext(name)[1].lower()
+    for fmt, item in FORMATS.items():
+        if extension in item.extensions:
+            return fmt
+    return None
+
+
+def read(filename, fmt=None, **options):
+    """ Yield the frames of a (plain or compressed) log file ('options' are passed to the format reader) """
+    item = FORMATS[fmt or detect_format(filename) or 'socketcan']
+    with scio.open_input(filename, binary=item.binary) as inputfile:
+        yield from item.reader(inputfile, **options)
+
+
+def write(frames, filename, fmt=None, compression='auto'):
+    """ Write frames to a (plain or compressed) log file and return their number """
+    item = FORMATS[fmt or detect_format(filename) or 'socketcan']
+    with scio.open_output(filename, compression, binary=item.binary) as outfile:
+        return item.writer(frames, outfile)
+
+
+def convert(source, destination, informat=None, outformat=None, compression='auto', **options):
+    """ Convert a log file into another format in a single streaming pass and return the number of frames """
+    return write(read(source, informat, **options), destination, outformat, compression)
+
+
+def benchmark(count=BENCHMARK_FRAMES, formats=None, out=sys.stdout):
+    """ Measure the write and read throughput of every format on 'count' synthetic frames """
+    offset = scgen.START_TIME * 1000000
+    frames = [(timestamp + offset, scgen.CHANNELS[channel], canid, payload)
+              for timestamp, channel, canid, payload in scgen.frames(count)]
+    print('FORMAT -> SIZE (MB) -> WRITE (frames/s) -> READ (frames/s) -> READ (MB/s)', file=out)
+    if formats is None:                                        # Alias names are measured once
+        formats = [fmt for fmt, item in FORMATS.items()
+                   if fmt == next(name for name, other in FORMATS.items() if other.reader == item.reader)]
+    with tempfile.TemporaryDirectory() as workdir:
+        for fmt in formats:
+            filename = os.path.join(workdir, 'scfmt.' + fmt)
+            start = time.perf_counter()
+            write(frames, filename, fmt, None)
+            written = time.perf_counter() - start
+            start = time.perf_counter()
+            frames_read = sum(1 for _ in read(filename, fmt))
+            seconds = time.perf_counter() - start
+            size = os.path.getsize(filename)
+            print('%s -> %.1f -> %.0f -> %.0f -> %.1f%s' % (
+                fmt, size / 1e6, count / written, frames_read / seconds, size / seconds / 1e6,
+                '' if frames_read == count else ' (%s frames read)' % frames_read), file=out)
+
+
+def main(argv=None):
+    """ Command line wrapper of the formats converter """
+    parser = argparse.ArgumentParser(description='Convert CAN Bus log files between formats.')
+    parser.add_argument('source', nargs='?', help='input log file')
+    parser.add_argument('destination', nargs='?', help='output log file (overwritten)')
+    parser.add_argument('-f', '--from', dest='informat', choices=list(FORMATS),
+                        help='input format (default: from the file extension, socketcan if unknown)')
+    parser.add_argument('-t', '--to', dest='outformat', choices=list(FORMATS),
+                        help='output format (default: from the file extension, socketcan if unknown)')
+    parser.add_argument('-c', '--compression', choices=('gz', 'bz2', 'xz', 'auto'), default='auto',
+                        help='output compression (default: auto, from the file extension)')
+    parser.add_argument('-v', '--vehicle', choices=sorted(scconv.load_dlc_tables()),
+                        help='payload lenghts table of New Dep input files (default: %s)' % scconv.VEHICLE)
+    parser.add_argument('-b', '--benchmark', action='store_true', help='measure the throughput of every format')
+    parser.add_argument('-n', '--frames', type=int, default=BENCHMARK_FRAMES,
+                        help='benchmark frames (default: %s)' % BENCHMARK_FRAMES)
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(args.frames)
+        return 0
+    if not args.source or not args.destination:
+        parser.error('source and destination are required')
+    options = {}
+    if args.vehicle:
+        if (args.informat or detect_format(args.source)) != 'newdep':
+            parser.error('--vehicle is for New Dep input files only')
+        options['lengths'] = scconv.dlc_table(args.vehicle)
+    convert(args.source, args.destination, args.informat, args.outformat, args.compression, **options)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
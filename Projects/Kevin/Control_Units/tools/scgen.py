@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" This is scgen.py (Socketcan Generator) script to generate synthetic CAN Bus dump files.
+
+This file is a temporary script for test & debug.
+
+In this version we implemented a generator of realistic CAN Bus dump files, to test and
+measure the tools without real recordings:
+
+    python3 scgen.py [--frames N] [--ids N] [--periods MS,...] [--dlcs DLC,...]
+                     [--format socketcan|newdep] [--seed S] outputfile
+
+Every CAN ID gets a period (PERIODS, '--periods'), a DLC (DLCS, '--dlcs') and a channel; its frames are sent
+with a small timing jitter and the streams of all the CAN IDs are merged in time order.
+Payloads look like real ones: Byte 0 is a rolling counter, Bytes 1-2 a slowly changing
+16 bits signal, Byte 3 a noisy value and the other Bytes are constant. Output formats are:
+
+- socketcan: '(1465912800.000000) can0 201#0366400000000080'
+- newdep:    '1 12:345:678 0 8 02 01 03 66 40 00 00 00 00 80', i.e. channel (1 or 2),
+             seconds:milliseconds:microseconds, two fields we do not use (written as the
+             '0' placeholder and the DLC), the CAN ID as two Bytes and always 8 data Bytes
+             (see scconv.py).
+
+=========================================================================================
+
+Versions history:
+
+v.0.0.1 (20261017):
+- added the '--periods' and '--dlcs' options.
+
+v.0.0.0 (20261017):
+- baseline version.
+
+=========================================================================================
+
+This script can be improved a lot!"""
+
+__version__    =  "0.0.1"
+
+__author__     =  "Valerio Vannucci"
+__copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
+__credits__    = ["Valerio Vannucci"]
+__license__    =  "Creative Commons 4.0 International: CC-B-Y-S-A"
+__maintainer__ =  "Valerio Vannucci"
+__email__      =  "valerio.vannucci@iaiagi.com"
+__status__     =  "Prototype"
+
+# Import statements here
+import sys                                                     # Standard output and command line management
+import math                                                    # Signals generation
+import heapq                                                   # Time ordered merge of the CAN ID streams
+import random                                                  # Random numbers management
+import argparse                                                # Command line arguments management
+
+import scio                                                    # Plain and compressed dump files I/O
+
+# Global variables here
+START_TIME = 1465912800                                        # Epoch of the first frame: 14/06/2016 16.00 (the Fiesta recordings)
+PERIODS = (10, 20, 50, 100, 200, 500, 1000)                    # Periods of the CAN IDs in milliseconds
+DLCS = (2, 3, 4, 6, 7, 8, 8, 8, 8)                             # DLCs of the CAN IDs (8 is the most common)
+JITTER = 0.02                                                  # Timing jitter as a fraction of the period
+CHANNELS = ('can0', 'can1')                                    # Socketcan channel names (New Dep uses 1 and 2)
+
+
+# Custom functions here
+def make_ids(count, rnd, channels=len(CHANNELS), periods=PERIODS, dlcs=DLCS):
+    """ Return a list of (CAN ID, period in microseconds, DLC, channel index) for 'count' CAN IDs
+
+    Periods (milliseconds) and DLCs are picked at random from 'periods' and 'dlcs'. """
+    ids = rnd.sample(range(0x010, 0x7FF), count)
+    return [(canid, rnd.choice(periods) * 1000, rnd.choice(dlcs), rnd.randrange(channels)) for canid in sorted(ids)]
+
+
+def frames(count, ids=40, seed=0, periods=PERIODS, dlcs=DLCS):
+    """ Yield 'count' synthetic frames as (timestamp in microseconds, channel index, CAN ID, payload Bytes) """
+    rnd = random.Random(seed)
+    table = make_ids(ids, rnd, periods=periods, dlcs=dlcs)
+    heap = [(rnd.randrange(period), index) for index, (canid, period, dlc, channel) in enumerate(table)]
+    heapq.heapify(heap)
+    sent = [0] * len(table)
+    constant = [bytes(rnd.randrange(256) for _ in range(8)) for _ in table]
+
+    for _ in range(count):
+        timestamp, index = heapq.heappop(heap)
+        canid, period, dlc, channel = table[index]
+        number = sent[index]
+        sent[index] += 1
+        signal = int(32768 + 30000 * math.sin(number / 500.0))
+        payload = bytearray(constant[index])
+        payload[0] = number & 0xFF
+        payload[1], payload[2] = signal >> 8, signal & 0xFF
+        payload[3] = rnd.randrange(256)
+        yield timestamp, channel, canid, bytes(payload[:dlc])
+        heapq.heappush(heap, (timestamp + period + int(rnd.gauss(0, period * JITTER)), index))
+
+
+def format_socketcan(timestamp, channel, canid, payload):
+    """ Format a frame as a Socketcan dump file row """
+    timestamp += START_TIME * 1000000
+    return '(%d.%06d) %s %03X#%s\n' % (timestamp // 1000000, timestamp % 1000000, CHANNELS[channel], canid,
+                                       payload.hex().upper())
+
+
+def format_newdep(timestamp, channel, canid, payload):
+    """ Format a frame as a New Dep dump file row (always 8 data Bytes) """
+    seconds, micros = divmod(timestamp, 1000000)
+    return '%s %s:%03d:%03d 0 %s %02X %02X %s\n' % (channel + 1, seconds, micros // 1000, micros % 1000, len(payload),
+                                                   canid >> 8, canid & 0xFF,
+                                                   ' '.join('%02X' % value for value in payload.ljust(8, b'\x00')))
+
+
+FORMATS = {'socketcan': format_socketcan, 'newdep': format_newdep}
+
+
+def generate(filename, count, ids=40, fmt='socketcan', seed=0, compression='auto', periods=PERIODS, dlcs=DLCS):
+    """ Write a synthetic dump file of 'count' frames and return its size in Bytes """
+    formatter = FORMATS[fmt]
+    size = 0
+    with scio.open_output(filename, compression) as outfile:
+        for frame in frames(count, ids, seed, periods, dlcs):
+            line = formatter(*frame)
+            size += len(line)
+            outfile.write(line)
+    return size
+
+
+def main(argv=None):
+    """ Command line wrapper of the generator """
+    parser = argparse.ArgumentParser(description='Generate a synthetic CAN Bus dump file.')
+    parser.add_argument('outputfile', help='output dump file (compressed if it ends with .gz, .bz2 or .xz)')
+    parser.add_argument('-n', '--frames', type=int, default=100000, help='number of frames (default: 100000)')
+    parser.add_argument('-i', '--ids', type=int, default=40, help='number of CAN IDs (default: 40)')
+    parser.add_argument('-f', '--format', choices=sorted(FORMATS), default='socketcan',
+                        help='output format (default: socketcan)')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='random seed (default: 0)')
+    parser.add_argument('-p', '--periods', default=','.join(str(period) for period in PERIODS), metavar='MS[,MS...]',
+                        help='periods of the CAN IDs in milliseconds, picked at random (default: %(default)s)')
+    parser.add_argument('-d', '--dlcs', default=','.join(str(dlc) for dlc in DLCS), metavar='DLC[,DLC...]',
+                        help='DLCs of the CAN IDs, picked at random (repeat one to make it more likely, '
+                             'default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    try:
+        periods = [int(item) for item in args.periods.split(',')]
+        dlcs = [int(item) for item in args.dlcs.split(',')]
+    except ValueError:
+        parser.error('periods and DLCs must be comma separated integers')
+    if min(periods) <= 0 or not all(0 <= dlc <= 8 for dlc in dlcs):
+        parser.error('periods must be positive and DLCs between 0 and 8')
+    generate(args.outputfile, args.frames, args.ids, args.format, args.seed, periods=periods, dlcs=dlcs)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" This is scmerge.py (Socketcan Merge) script to merge CAN Bus log files into one time ordered Socketcan dump file.
+
+This file is a temporary script for test & debug.
+
+Analysis often needs the two buses of a car, or several separate recordings, in one time
+ordered stream. This script merges any number of log files (any format of scfmt.py,
+plain or compressed) with a heap based k-way merge:
+
+    python3 scmerge.py [--reorder N] [--map [INPUT:]OLD=NEW ...] output.dump input1 input2 ...
+
+Inputs are read as streams, never loaded in memory: the merge keeps one frame for every
+input (O(k) memory) plus, for every input, a reorder buffer of REORDER frames that
+sorts small local disorders (e.g. the rows of two channels written by two threads).
+Frames older than the last written one even after the reorder buffer are written
+anyway, where they are, and counted as late: a larger '--reorder' fixes them. Equal
+timestamps keep the inputs order.
+
+Channel names are preserved, or remapped with '--map OLD=NEW' (all inputs) or
+'--map INPUT:OLD=NEW' (INPUT is the input position, from 1), e.g. to merge two
+recordings of can0 as can0 and can1:
+
+    python3 scmerge.py --map 2:can0=can1 merged.dump car_on.dump kit.dump
+
+The output format is taken from the output file extension (socketcan if unknown, see
+scfmt.py); '-' writes Socketcan rows to the standard output.
+
+=========================================================================================
+
+Versions history:
+
+v.0.0.0 (20261017):
+- baseline version.
+
+=========================================================================================
+
+This script can be improved a lot!"""
+
+__version__    =  "0.0.0"
+
+__author__     =  "Valerio Vannucci"
+__copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
+__credits__    = ["Valerio Vannucci"]
+__license__    =  "Creative Commons 4.0 International: CC-B-Y-S-A"
+__maintainer__ =  "Valerio Vannucci"
+__email__      =  "valerio.vannucci@iaiagi.com"
+__status__     =  "Prototype"
+
+# Import statements here
+import sys                                                     # Standard output and command line management
+import heapq                                                   # k-way merge and reorder buffers
+import argparse                                                # Command line arguments management
+import operator                                                # Frames sort key
+
+import scfmt                                                   # CAN Bus log formats
+
+# Global variables here
+REORDER = 256                                                  # Frames of the reorder buffer of every input
+
+_timestamp = operator.itemgetter(0)                            # Frames are sorted by timestamp
+
+
+# Custom functions here
+def reorder(frames, size=REORDER):
+    """ Yield the frames of a nearly sorted stream in time order, through a buffer of 'size' frames
+
+    Frames displaced by less than 'size' positions come out sorted; the sequence
+    number keeps equal timestamps in their original order. """
+    heap = []
+    for number, frame in enumerate(frames):
+        if len(heap) >= size:
+            yield heapq.heappushpop(heap, (frame[0], number, frame))[2]
+        else:
+            heapq.heappush(heap, (frame[0], number, frame))
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def remap(frames, channels):
+    """ Yield frames with their channel names remapped ('channels': old name -> new name) """
+    for timestamp, channel, canid, data in frames:
+        yield timestamp, channels.get(channel, channel), canid, data
+
+
+def merge(streams, size=REORDER, stats=None):
+    """ Merge frame streams into one time ordered stream
+
+    If 'stats' is a dict, stats['late'] counts the frames still out of order after the
+    reorder buffers. """
+    latest = None
+    late = 0
+    for frame in heapq.merge(*[reorder(stream, size) if size > 1 else stream for stream in streams], key=_timestamp):
+        if latest is not None and frame[0] < latest:
+            late += 1
+        else:
+            latest = frame[0]
+        yield frame
+    if stats is not None:
+        stats['late'] = late
+
+
+def parse_maps(maps, inputs):
+    """ Convert '--map [INPUT:]OLD=NEW' items into one 'old name -> new name' dict for every input """
+    channels = [{} for _ in range(inputs)]
+    for item in maps:
+        target, sep, new = item.partition('=')
+        if not sep or not new:
+            raise ValueError('Bad channel map: %s' % item)
+        index, sep, old = target.rpartition(':')
+        indexes = range(inputs) if not sep else [int(index) - 1]
+        for position in indexes:
+            if not 0 <= position < inputs:
+                raise ValueError('Bad input position in channel map: %s' % item)
+            channels[position][old] = new
+    return channels
+
+
+def main(argv=None):
+    """ Command line wrapper of the merge """
+    parser = argparse.ArgumentParser(description='Merge CAN Bus log files into one time ordered stream.')
+    parser.add_argument('output', help="merged log file ('-' for Socketcan rows on the standard output)")
+    parser.add_argument('inputs', nargs='+', help='log files sorted by time (small local disorders are fixed)')
+    parser.add_argument('-r', '--reorder', type=int, default=REORDER,
+                        help='reorder buffer frames of every input (default: %s)' % REORDER)
+    parser.add_argument('-m', '--map', action='append', default=[], metavar='[INPUT:]OLD=NEW',
+                        help='rename a channel of all the inputs or of input INPUT (from 1)')
+    parser.add_argument('-f', '--from', dest='informat', choices=list(scfmt.FORMATS),
+                        help='inputs format (default: from the file extensions)')
+    args = parser.parse_args(argv)
+
+    try:
+        channels = parse_maps(args.map, len(args.inputs))
+    except ValueError as error:
+        parser.error(str(error))
+    streams = []
+    for filename, mapping in zip(args.inputs, channels):
+        frames = scfmt.read(filename, args.informat)
+        streams.append(remap(frames, mapping) if mapping else frames)
+
+    stats = {}
+    merged = merge(streams, args.reorder, stats)
+    if args.output == '-':
+        count = scfmt.write_socketcan(merged, sys.stdout)
+    else:
+        count = scfmt.write(merged, args.output)
+    print('Frames: %s (late: %s)' % (count, stats.get('late', 0)), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" This is scmiss.py (Socketcan Missing) script to build the canloop.py schedule of the missing CAN IDs.
+
+This file is a temporary script for test & debug.
+
+canloop.py restores the CAN IDs that the original car electronics stop sending after the
+conversion. This script finds them and compiles the canloop.py messages table from two
+recordings: a reference recording of the original car ("car on") and a recording of
+the converted car ("conversion kit"), or a live capture of it:
+
+    python3 scmiss.py [--channel can0] [--output canloop_table.txt] reference.dump kit.dump
+    python3 scmiss.py [--channel can0] --capture 10 [--bus socketcan:can0] reference.dump
+    python3 scmiss.py --self-test
+
+The CAN IDs of the reference recording (of '--channel' only, if given) that never appear
+in the kit recording are missing. For every missing CAN ID with at least MIN_FRAMES
+frames the period is the median time between its frames (see scds.py, rounded to
+PERIOD_ROUND ms) and the representative payload is made of the most frequent value of
+every Byte (rolling counters and checksums need canloop.py payload generators). The table is
+written in the canloop.py table file format ('-' for an empty payload), sorted by CAN ID, with the analysed
+recordings in its header: canloop.py loads it at startup as it is, so the recordings are
+analysed once on the PC and never on the car.
+
+=========================================================================================
+
+Versions history:
+
+v.0.0.2 (20261017):
+- CAN IDs with an empty payload are written with the '-' data placeholder of canloop.py.
+- added the self test (--self-test).
+
+v.0.0.1 (20261017):
+- fixed '--capture 0' taken as no capture.
+
+v.0.0.0 (20261017):
+- baseline version.
+
+=========================================================================================
+
+This script can be improved a lot!"""
+
+__version__    =  "0.0.2"
+
+__author__     =  "Valerio Vannucci"
+__copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
+__credits__    = ["Valerio Vannucci"]
+__license__    =  "Creative Commons 4.0 International: CC-B-Y-S-A"
+__maintainer__ =  "Valerio Vannucci"
+__email__      =  "valerio.vannucci@iaiagi.com"
+__status__     =  "Prototype"
+
+# Import statements here
+import io                                                      # In memory capture rows
+import os                                                      # File system management
+import sys                                                     # Standard output and command line management
+import time                                                    # Time management
+import argparse                                                # Command line arguments management
+import collections                                             # Specialized data types management
+
+import numpy as np                                             # Columnar arrays management
+
+import scds                                                    # Cycle times statistics
+import scfmt                                                   # Socketcan rows of the live capture
+import sccache                                                 # Columnar cache of the dump files
+
+# Global variables here
+OUTPUT_FILE = 'canloop_table.txt'                              # Default schedule file (copy it next to canloop.py)
+MIN_FRAMES = 3                                                 # Fewer frames are not enough to learn a period
+PERIOD_ROUND = 1                                               # Periods are rounded to this number of milliseconds
+CAPTURE_BUS = 'socketcan:can0'                                 # Default live capture bus
+
+# Custom classes here
+Missing = collections.namedtuple('Missing', ('canid', 'channel', 'period', 'payload', 'frames', 'constant'))
+Missing.__doc__ = """ A missing CAN ID: period in ms, representative payload Bytes and its number of constant Bytes """
+
+
+# Custom functions here
+def capture(seconds, interface='socketcan', channel='can0'):
+    """ Receive CAN Bus frames for 'seconds' seconds and return them as columnar CAN frames (see sccache.py) """
+    import can                                                 # Only the live capture requires python-can
+
+    frames = []
+    end = time.monotonic() + seconds
+    with can.interface.Bus(channel=channel, interface=interface) as bus:
+        while time.monotonic() < end:
+            msg = bus.recv(max(0.0, end - time.monotonic()))
+            if msg is None or msg.is_error_frame:
+                continue
+            canid = msg.arbitration_id | (sccache.CAN_EFF_FLAG if msg.is_extended_id else 0)
+            frames.append((int(msg.timestamp * 1e6), channel, canid, bytes(msg.data)))
+    rows = io.StringIO()
+    scfmt.write_socketcan(frames, rows)
+    return sccache.parse_lines(rows.getvalue().splitlines())
+
+
+def missing_ids(reference, kit, channel=None, min_frames=MIN_FRAMES):
+    """ Return the Missing CAN IDs of the reference columnar frames that never appear in the kit ones """
+    if channel is not None:                                    # Only the frames of a channel of the reference
+        if channel not in reference.channels:
+            raise ValueError('No channel %s in the reference recording' % channel)
+        mask = reference.chan == reference.channels.index(channel)
+        reference = sccache.CanFrames(*(column[mask] for column in reference[:5]), channels=reference.channels)
+    ids = np.setdiff1d(np.unique(reference.id), np.unique(kit.id))
+
+    timing = scds.timing_stats(reference)
+    result = []
+    if timing is None:
+        return result
+    for index in np.flatnonzero(np.isin(timing['id'], ids) & (timing['frames'] >= min_frames)):
+        canid = int(timing['id'][index])
+        chan = int(timing['chan'][index])
+        mask = (reference.id == canid) & (reference.chan == chan)
+        dlc = int(np.argmax(np.bincount(reference.dlc[mask])))    # The most frequent DLC
+        data = np.asarray(reference.data[mask])
+        payload = bytearray()
+        constant = 0
+        for byte in range(dlc):                                # The most frequent value of every Byte
+            counts = np.bincount(data[:, byte], minlength=256)
+            payload.append(int(np.argmax(counts)))
+            constant += int(counts.max() == len(data))
+        period = max(PERIOD_ROUND, round(timing['median'][index] / 1000.0 / PERIOD_ROUND) * PERIOD_ROUND)
+        result.append(Missing(canid, reference.channels[chan], period, bytes(payload), int(timing['frames'][index]),
+                              constant))
+    result.sort(key=lambda item: (item.canid, item.channel))
+    return result
+
+
+def write_schedule(missing, filename, sources=()):
+    """ Write the Missing CAN IDs as a canloop.py table file """
+    with open(filename + '.tmp', 'w') as outfile:
+        print('# canloop.py missing CAN IDs table generated by scmiss.py v%s on %s' % (
+            __version__, time.strftime('%Y-%m-%d %H:%M:%S')), file=outfile)
+        for source in sources:
+            print('# %s' % source, file=outfile)
+        print('#\n# CAN ID    PERIOD (ms)     DATA', file=outfile)
+        for item in missing:
+            print('%-11s %-15g %-20s # %s, %s frames, %s of %s Bytes constant' % (
+                sccache.format_canid(item.canid), item.period, item.payload.hex().upper() or '-', item.channel,
+                item.frames, item.constant, len(item.payload)), file=outfile)
+    os.replace(filename + '.tmp', filename)                    # canloop.py never reads a partial table
+
+
+def self_test(out=sys.stdout):
+    """ Check that canloop.py loads a schedule built from synthetic recordings, print out the result and return True
+    if it passed """
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'D-ECU', 'Services'))
+    import tempfile
+    import canloop                                             # Requires python-can
+
+    reference = []
+    for number in range(100):                                  # 201 is sent by the kit too, 123 (empty) and 1ABCDEF0 are not
+        timestamp = 1465912800000000 + number * 10000
+        reference.append('(%d.%06d) can0 201#%02X66\n' % (timestamp // 1000000, timestamp % 1000000, number))
+        reference.append('(%d.%06d) can0 123#\n' % (timestamp // 1000000, timestamp % 1000000 + 1))
+        reference.append('(%d.%06d) can0 1ABCDEF0#0102\n' % (timestamp // 1000000, timestamp % 1000000 + 2))
+    kit = [row for row in reference if ' 201#' in row]
+    missing = missing_ids(sccache.parse_lines(reference), sccache.parse_lines(kit))
+    with tempfile.TemporaryDirectory() as workdir:
+        filename = os.path.join(workdir, OUTPUT_FILE)
+        write_schedule(missing, filename, ['self test'])
+        table = canloop.load_table(filename)
+    found = sorted((msg.arbitration_id, msg.is_extended_id, round(period * 1000), bytes(msg.data))
+                   for period, msg, generators in table)
+    expected = [(0x123, False, 10, b''), (0x1ABCDEF0, True, 10, b'\x01\x02')]
+    passed = found == expected
+    print('%s: canloop.py loads the schedule (empty payloads included)' % ('PASSED' if passed else 'FAILED'), file=out)
+    if not passed:
+        print('    expected: %s\n    found:    %s' % (expected, found), file=out)
+    return passed
+
+
+def main(argv=None):
+    """ Command line wrapper of the missing CAN IDs schedule builder """
+    parser = argparse.ArgumentParser(description='Build the canloop.py schedule of the CAN IDs missing in a kit recording.')
+    parser.add_argument('reference', nargs='?', help='reference Socketcan dump file (the "car on" recording)')
+    parser.add_argument('kit', nargs='?', help='Socketcan dump file of the "conversion kit" recording')
+    parser.add_argument('-c', '--channel', help='only the CAN IDs of this channel of the reference recording')
+    parser.add_argument('-m', '--min-frames', type=int, default=MIN_FRAMES,
+                        help='minimum frames of a missing CAN ID (default: %s)' % MIN_FRAMES)
+    parser.add_argument('--capture', type=float, metavar='SECONDS', help='capture the kit frames live for SECONDS')
+    parser.add_argument('--bus', default=CAPTURE_BUS, metavar='INTERFACE:CHANNEL',
+                        help='live capture bus (default: %s)' % CAPTURE_BUS)
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE, help="schedule file (default: '%s')" % OUTPUT_FILE)
+    parser.add_argument('--self-test', action='store_true',
+                        help='check that canloop.py loads a schedule built from synthetic recordings and exit')
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if self_test() else 1
+    if args.reference is None:
+        parser.error('the reference recording is required')
+    if (args.kit is None) == (args.capture is None):
+        parser.error('give either a kit recording or --capture')
+    reference = sccache.load(args.reference)
+    if args.capture is not None:
+        interface, _, channel = args.bus.partition(':')
+        kit = capture(args.capture, interface, channel)
+        sources = ['reference: %s' % os.path.basename(args.reference),
+                   'kit: live capture of %s s on %s' % (args.capture, args.bus)]
+    else:
+        kit = sccache.load(args.kit)
+        sources = ['reference: %s' % os.path.basename(args.reference), 'kit: %s' % os.path.basename(args.kit)]
+
+    missing = missing_ids(reference, kit, args.channel, args.min_frames)
+    write_schedule(missing, args.output, sources)
+    print('Missing CAN IDs: %s (written to %s)' % (len(missing), args.output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" This is scquery.py (Socketcan Query) script to extract the frames of a CAN ID and/or a time window from Socketcan dump files.
+
+This file is a temporary script for test & debug.
+
+In this version we implemented a query engine that answers questions like "all frames of
+0x201 between t=120s and t=180s" without grepping the whole dump file:
+
+    python3 scquery.py [--id 201] [--start 120] [--end 180] [--absolute] [--numpy out.npz] inputfile.dump
+
+The first query builds an index of the dump file, saved in a directory named after it
+(e.g. 'inputfile.dump.index') and reused while the dump file mtime and size are unchanged:
+
+- a sparse timestamp index: the timestamp and the file offset of every INDEX_STEP rows;
+- a per CAN ID offset index: the file offsets and the timestamps of the rows of every
+  CAN ID, sorted by CAN ID and by timestamp.
+
+A CAN ID query finds its rows with a binary search in the per CAN ID index and seeks to
+them; a time window query without CAN ID finds the first row with a binary search in the
+sparse index, seeks there and reads the file only up to the end of the window. Times are
+in seconds from the first frame of the recording (or Epoch seconds with '--absolute').
+Matching rows are printed in Socketcan format, or saved as NumPy arrays (see sccache.py)
+with '--numpy'. The dump file rows must be in time order, as candump writes them, and the
+file cannot be compressed (compressed files cannot be seeked).
+
+=========================================================================================
+
+Versions history:
+
+v.0.0.0 (20261017):
+- baseline version.
+
+=========================================================================================
+
+This script can be improved a lot!"""
+
+__version__    =  "0.0.0"
+
+__author__     =  "Valerio Vannucci"
+__copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
+__credits__    = ["Valerio Vannucci"]
+__license__    =  "Creative Commons 4.0 International: CC-B-Y-S-A"
+__maintainer__ =  "Valerio Vannucci"
+__email__      =  "valerio.vannucci@iaiagi.com"
+__status__     =  "Prototype"
+
+# Import statements here
+import os                                                      # File system management
+import sys                                                     # Standard output and command line management
+import json                                                    # Index metadata management
+import array                                                   # Compact arrays of numbers used while indexing
+import argparse                                                # Command line arguments management
+
+import numpy as np                                             # Index arrays management
+
+import scio                                                    # Plain and compressed dump files I/O
+import sccache                                                 # Columnar CAN frames
+
+# Global variables here
+INDEX_VERSION = 1                                              # Index format version: indexes of other versions are rebuilt
+INDEX_SUFFIX = '.index'                                        # Index directory name is the dump file name plus this suffix
+INDEX_STEP = 1024                                              # Rows between two items of the sparse timestamp index
+ARRAYS = ('sparse_ts', 'sparse_offset', 'ids', 'id_starts', 'id_ts', 'id_offset')
+
+
+# Custom functions here
+def parse_canid(cancode):
+    """ Convert a CAN ID as written in the dump files (e.g. '201') into the sccache.py coding """
+    canid = int(cancode, 16)
+    return canid | sccache.CAN_EFF_FLAG if len(cancode) > 3 else canid
+
+
+def index_path(dumpfile):
+    """ Return the index directory of a dump file """
+    return dumpfile + INDEX_SUFFIX
+
+
+def _source_stamp(dumpfile):
+    """ Return what identifies a version of the source dump file """
+    info = os.stat(dumpfile)
+    return {'mtime_ns': info.st_mtime_ns, 'size': info.st_size}
+
+
+# Custom classes here
+class DumpIndex(object):
+    """ Sparse timestamp index and per CAN ID offset index of a Socketcan dump file """
+
+    def __init__(self, dumpfile, rebuild=True):
+        if scio.is_compressed(dumpfile):
+            raise ValueError('Compressed dump files cannot be queried: %s' % dumpfile)
+        self.dumpfile = dumpfile
+        self.indexdir = index_path(dumpfile)
+        if not self.is_valid():
+            if not rebuild:
+                raise FileNotFoundError('No valid index for %s' % dumpfile)
+            self.build()
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(self.indexdir, name + '.npy'), mmap_mode='r'))
+        with open(os.path.join(self.indexdir, 'meta.json')) as metafile:
+            meta = json.load(metafile)
+        self.rows = meta['rows']
+        self.first = meta['first']                             # Timestamp of the first row in microseconds
+
+    def is_valid(self):
+        """ Check whether the index exists and is up to date """
+        try:
+            with open(os.path.join(self.indexdir, 'meta.json')) as metafile:
+                meta = json.load(metafile)
+        except (OSError, ValueError):
+            return False
+        return meta.get('version') == INDEX_VERSION and meta.get('source') == _source_stamp(self.dumpfile)
+
+    def build(self):
+        """ Read the dump file once and write its index """
+        stamp = _source_stamp(self.dumpfile)
+        sparse_ts, sparse_offset = array.array('q'), array.array('q')
+        ts, ids, offsets = array.array('q'), array.array('I'), array.array('q')
+        offset = 0
+        latest = None
+        with open(self.dumpfile, 'rb', buffering=scio.BUFFER_SIZE) as inputfile:
+            for line in inputfile:                             # Start processing the input one row at a time
+                inputlist = line.split()
+                if len(inputlist) >= 3 and b'#' in inputlist[2]:
+                    timestamp = sccache.parse_timestamp(inputlist[0].strip(b'()').decode())
+                    if len(ts) % INDEX_STEP == 0:
+                        latest = timestamp if latest is None else max(latest, timestamp)
+                        sparse_ts.append(latest)
+                        sparse_offset.append(offset)
+                    ts.append(timestamp)
+                    ids.append(parse_canid(inputlist[2].split(b'#')[0].decode()))
+                    offsets.append(offset)
+                offset += len(line)
+
+        ts = np.frombuffer(ts, dtype=np.int64)
+        ids = np.frombuffer(ids, dtype=np.uint32)
+        order = np.lexsort((ts, ids))                          # Sorted by CAN ID, then by timestamp
+        unique, starts = np.unique(ids[order], return_index=True)
+        arrays = {
+            'sparse_ts': np.frombuffer(sparse_ts, dtype=np.int64),
+            'sparse_offset': np.frombuffer(sparse_offset, dtype=np.int64),
+            'ids': unique.astype(np.uint32),
+            'id_starts': np.r_[starts, len(order)].astype(np.int64),
+            'id_ts': ts[order],
+            'id_offset': np.frombuffer(offsets, dtype=np.int64)[order],
+        }
+
+        os.makedirs(self.indexdir, exist_ok=True)
+        metafile = os.path.join(self.indexdir, 'meta.json')
+        if os.path.exists(metafile):                           # Invalidate the old index before overwriting its arrays
+            os.remove(metafile)
+        for name in ARRAYS:
+            np.save(os.path.join(self.indexdir, name + '.npy'), arrays[name])
+        with open(metafile, 'w') as outfile:                   # Written last, so that a partial index is never valid
+            json.dump({'version': INDEX_VERSION, 'source': stamp, 'rows': len(ts),
+                       'first': int(ts.min()) if len(ts) else 0}, outfile, indent=1)
+
+    def query(self, canid=None, start=None, end=None):
+        """ Yield the rows (as text) of a CAN ID and/or of a time window [start, end)
+
+        'canid' is coded as in sccache.py, 'start' and 'end' are Epoch microseconds. """
+        start = -2 ** 63 if start is None else start
+        end = 2 ** 63 - 1 if end is None else end
+        with open(self.dumpfile, 'rb') as inputfile:
+            if canid is not None:
+                position = np.searchsorted(self.ids, canid)
+                if position == len(self.ids) or self.ids[position] != canid:
+                    return
+                first, last = self.id_starts[position], self.id_starts[position + 1]
+                timestamps = self.id_ts[first:last]
+                low = first + np.searchsorted(timestamps, start, side='left')
+                high = first + np.searchsorted(timestamps, end, side='left')
+                for offset in self.id_offset[low:high]:        # One seek per matching row
+                    inputfile.seek(int(offset))
+                    yield inputfile.readline().decode('ascii', 'replace')
+                return
+
+            position = max(np.searchsorted(self.sparse_ts, start, side='right') - 1, 0)
+            if len(self.sparse_offset):
+                inputfile.seek(int(self.sparse_offset[position]))
+            for line in inputfile:                             # Read only from the window start to its end
+                inputlist = line.split()
+                if len(inputlist) < 3:
+                    continue
+                timestamp = sccache.parse_timestamp(inputlist[0].strip(b'()').decode())
+                if timestamp >= end:
+                    return
+                if timestamp >= start:
+                    yield line.decode('ascii', 'replace')
+
+    def query_frames(self, canid=None, start=None, end=None):
+        """ Return the frames of a CAN ID and/or of a time window as columnar NumPy arrays (see sccache.py) """
+        return sccache.parse_lines(self.query(canid, start, end))
+
+
+def main(argv=None):
+    """ Command line wrapper of the query engine """
+    parser = argparse.ArgumentParser(description='Extract the frames of a CAN ID and/or a time window from a Socketcan dump file.')
+    parser.add_argument('inputfile', help='Socketcan dump file')
+    parser.add_argument('-i', '--id', help="CAN ID as written in the dump file (e.g. '201')")
+    parser.add_argument('-s', '--start', type=float, help='window start in seconds')
+    parser.add_argument('-e', '--end', type=float, help='window end in seconds (excluded)')
+    parser.add_argument('-a', '--absolute', action='store_true',
+                        help='times are Epoch seconds instead of seconds from the first frame')
+    parser.add_argument('-n', '--numpy', metavar='FILE', help='save the matching frames as NumPy arrays (.npz) to FILE')
+    args = parser.parse_args(argv)
+
+    index = DumpIndex(args.inputfile)
+    base = 0 if args.absolute else index.first
+    start = None if args.start is None else base + int(round(args.start * 1e6))
+    end = None if args.end is None else base + int(round(args.end * 1e6))
+    canid = None if args.id is None else parse_canid(args.id)
+
+    if args.numpy:
+        frames = index.query_frames(canid, start, end)
+        np.savez(args.numpy, channels=np.array(frames.channels),
+                 **{column: getattr(frames, column) for column in sccache.COLUMNS})
+        print('Frames: %s' % len(frames.ts))
+    else:
+        for line in index.query(canid, start, end):
+            sys.stdout.write(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
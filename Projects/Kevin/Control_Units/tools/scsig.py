@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" This is scsig.py (Socketcan Signals) script to propose the signals layout of the CAN IDs found in Socketcan dump files.
+
+This file is a temporary script for test & debug.
+
+In this version we implemented an engine that, on top of the scds statistics, proposes a
+signals layout for every CAN ID and writes it as a DBC-like description file:
+
+    python3 scsig.py [--state scsig_state.npz] [--output signals.dbc] recording.dump [...]
+
+For every CAN ID the following statistics are collected (see 'SignalStats'):
+
+- how many times every payload bit is set and toggles between consecutive frames;
+- how many times every couple of bits toggles in the same frame (correlated toggles);
+- how many times every bit has the same value of the following one (sign extension);
+- how many times every nibble and Byte increments by one (rolling counters);
+- how many times every Byte matches a XOR, SUM or CRC8 checksum of the other Bytes.
+
+Then the layout is proposed this way:
+
+1. a nibble or Byte that increments by one in at least COUNTER_THRESHOLD of the frame
+   transitions is a rolling counter (a Byte only if its high nibble changes too and it
+   increments at least as often as its nibbles: a 4 bits counter also makes its Byte
+   increment in 15/16 of the transitions), a Byte that matches a checksum algorithm in at least
+   CHECKSUM_THRESHOLD of the frames is a checksum;
+2. the remaining changing bits are walked from the MSB of Byte 0 to the LSB of Byte 7
+   (the Motorola order) and split into fields where the toggle rate drops by an order of
+   magnitude (a less significant bit toggles at least as often as a more significant one)
+   or where the toggles of a bit are not linked to the toggles of the following one
+   (carry): the share of the toggles of a bit where the following one toggles too is
+   about the following bit toggle rate for independent bits and about 1 for linked bits,
+   so the excess over the toggle rate must be at least CARRY_THRESHOLD. Inside a Byte the
+   test is skipped for bits toggling more often than NOISE_RATE, that behave like noise;
+   a field spanning more Bytes also takes the constant MSBs of its first Byte;
+3. a field covering a whole Byte followed by a field ending with the LSB of the next Byte
+   is merged with it into a little endian (Intel) field when the LSB of the next Byte
+   toggles together with the MSB of the previous Byte (carry between them);
+4. a field whose two most significant bits have the same value in at least SIGN_THRESHOLD
+   of the frames and whose MSB is set in a significant amount of frames is signed.
+
+The statistics are additive: they are saved in a state file per processed recording
+(path, mtime and size), so re-running the script after adding a new recording only
+processes the new data, and a modified recording replaces its previous statistics. Recordings are loaded through their
+columnar cache (see sccache.py), so this script requires NumPy.
+
+'--self-test' checks the inference on synthetic payloads of known layout.
+
+=========================================================================================
+
+Versions history:
+
+v.0.0.2 (20261017):
+- fixed a modified recording counted twice: the state file keeps the statistics per recording.
+
+v.0.0.1 (20261017):
+- fixed 4 bits counters in a low nibble proposed as 8 bits counters.
+- fixed fast fields merged across Byte boundaries and constant MSBs of slow multi Byte signals.
+- added the inference self test (--self-test).
+
+v.0.0.0 (20261017):
+- baseline version.
+
+=========================================================================================
+
+This script can be improved a lot!"""
+
+__version__    =  "0.0.2"
+
+__author__     =  "Valerio Vannucci"
+__copyright__  =  "Copyright 2017 - 2018, iaiaGi Project"
+__credits__    = ["Valerio Vannucci"]
+__license__    =  "Creative Commons 4.0 International: CC-B-Y-S-A"
+__maintainer__ =  "Valerio Vannucci"
+__email__      =  "valerio.vannucci@iaiagi.com"
+__status__     =  "Prototype"
+
+# Import statements here
+import os                                                      # File system management
+import sys                                                     # Standard output and command line management
+import json                                                    # State file sources list management
+import math                                                    # Toggle rate magnitudes
+import argparse                                                # Command line arguments management
+import collections                                             # Specialized data types management
+
+import numpy as np                                             # Columnar arrays management
+
+import sccache                                                 # Columnar cache of the dump files
+import scds                                                    # Statistics engine (frames grouping)
+
+# Global variables here
+STATE_FILE = 'scsig_state.npz'                                 # Default file of the cached per CAN ID statistics
+OUTPUT_FILE = 'signals.dbc'                                    # Default DBC-like output file
+STATE_VERSION = 2                                              # State file version: states of other versions are discarded
+BLOCK = 1 << 16                                                # Frames processed at once for every CAN ID
+COUNTER_THRESHOLD = 0.9                                        # Minimum ratio of +1 increments of a rolling counter
+CHECKSUM_THRESHOLD = 0.95                                      # Minimum ratio of frames matching a checksum
+CARRY_THRESHOLD = 0.5                                          # Minimum ratio of toggles propagated to the following bit
+NOISE_RATE = 0.25                                              # Toggle rate above which the carry test is not meaningful
+SIGN_THRESHOLD = 0.9                                           # Minimum ratio of frames with the two MSBs of a field equal
+SIGN_MIN_RATIO = 0.05                                          # Minimum ratio of frames with the MSB set (or clear) of a signed field
+
+
+# Checksum lookup tables here
+def crc8_table(poly):
+    """ Return the lookup table of a CRC8 with polynomial 'poly' (MSB first) """
+    table = np.zeros(256, dtype=np.uint8)
+    for value in range(256):
+        crc = value
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[value] = crc
+    return table
+
+
+# Checksum algorithms: name -> (CRC8 lookup table or None, init value, final XOR value)
+CHECKSUMS = collections.OrderedDict([
+    ('xor', (None, 0x00, 0x00)),                               # XOR of the other Bytes
+    ('sum', (None, 0x00, 0x00)),                               # Sum modulo 256 of the other Bytes
+    ('crc8', (crc8_table(0x1D), 0xFF, 0xFF)),                  # CRC8 SAE J1850
+    ('crc8h2f', (crc8_table(0x2F), 0xFF, 0xFF)),               # CRC8 H2F (AUTOSAR)
+])
+
+
+# Custom classes here
+class SignalStats(object):
+    """ Additive statistics of the payload of a single CAN ID used to infer its signals
+
+    Bit positions are in the 'numpy.unpackbits' order: 8 x Byte + (7 - bit). """
+
+    __slots__ = ('frames', 'transitions', 'dlc', 'ones', 'toggles', 'cotoggles', 'agree', 'counters', 'checksums')
+
+    def __init__(self):
+        self.frames = 0                                        # Number of frames
+        self.transitions = 0                                   # Number of couples of consecutive frames
+        self.dlc = 0                                           # Maximum payload lenght in Bytes
+        self.ones = np.zeros(64, dtype=np.int64)               # Frames with every bit set
+        self.toggles = np.zeros(64, dtype=np.int64)            # Transitions toggling every bit
+        self.cotoggles = np.zeros((64, 64), dtype=np.int64)    # Transitions toggling every couple of bits together
+        self.agree = np.zeros(63, dtype=np.int64)              # Frames with every bit equal to the following one
+        self.counters = np.zeros(24, dtype=np.int64)           # +1 increments of nibbles (0-15, high nibble first) and Bytes (16-23)
+        self.checksums = np.zeros((8, len(CHECKSUMS)), dtype=np.int64)   # Frames where a Byte matches a checksum algorithm
+
+    def add(self, data, dlc, prev=None):
+        """ Account a block of consecutive payloads ('data' is a N x 8 array of uint8)
+
+        'prev' is the last payload of the previous block of the same recording, if any. """
+        self.frames += len(data)
+        self.dlc = max(self.dlc, int(dlc))
+        bits = np.unpackbits(data, axis=1)
+        self.ones += bits.sum(axis=0, dtype=np.int64)
+        self.agree += (bits[:, 1:] == bits[:, :-1]).sum(axis=0, dtype=np.int64)
+
+        rows = data if prev is None else np.concatenate((prev[None, :], data))
+        if len(rows) > 1:
+            self.transitions += len(rows) - 1
+            flips = np.unpackbits(rows[1:] ^ rows[:-1], axis=1).astype(np.float32)
+            self.toggles += flips.sum(axis=0, dtype=np.int64)
+            self.cotoggles += np.rint(flips.T @ flips).astype(np.int64)   # Exact: blocks are smaller than 2^24 frames
+            step = (rows[1:].astype(np.int16) - rows[:-1]) & 0xFF
+            nibbles = np.empty((len(step), 16), dtype=np.int16)
+            nibbles[:, 0::2] = (((rows[1:] >> 4).astype(np.int16) - (rows[:-1] >> 4)) & 0x0F)
+            nibbles[:, 1::2] = (((rows[1:] & 0x0F).astype(np.int16) - (rows[:-1] & 0x0F)) & 0x0F)
+            self.counters[:16] += (nibbles == 1).sum(axis=0)
+            self.counters[16:] += (step == 1).sum(axis=0)
+
+        payload = data[:, :self.dlc]
+        xor = np.bitwise_xor.reduce(payload, axis=1)
+        total = payload.sum(axis=1, dtype=np.int64)
+        for pos in range(self.dlc):                            # Checksum of all the other Bytes, for every Byte
+            column = payload[:, pos]
+            for index, (name, (table, init, final)) in enumerate(CHECKSUMS.items()):
+                if name == 'xor':
+                    value = xor ^ column
+                elif name == 'sum':
+                    value = ((total - column) & 0xFF).astype(np.uint8)
+                else:
+                    value = np.full(len(payload), init, dtype=np.uint8)
+                    for other in range(self.dlc):
+                        if other != pos:
+                            value = table[value ^ payload[:, other]]
+                    value ^= final
+                self.checksums[pos, index] += np.count_nonzero(value == column)
+
+    def merge(self, other):
+        """ Account the statistics of another recording of the same CAN ID """
+        for name in self.__slots__:
+            if name == 'dlc':
+                self.dlc = max(self.dlc, other.dlc)
+            else:
+                setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+# Custom functions here
+def collect(frames):
+    """ Compute the SignalStats of every CAN ID of columnar CAN frames (see sccache.py)
+
+    Returns a dict CAN ID -> SignalStats (CAN IDs on different channels are merged). """
+    order, key, starts = scds.group_frames(frames)
+    ends = np.r_[starts[1:], len(order)].astype(np.int64)
+    stats = {}
+    for start, end in zip(starts, ends):                       # One loop step per CAN ID and per block of frames
+        entry = SignalStats()
+        prev = None
+        dlc = frames.dlc[order[start:end]].max()
+        for offset in range(start, end, BLOCK):
+            data = np.asarray(frames.data[order[offset:min(offset + BLOCK, end)]])
+            entry.add(data, dlc, prev)
+            prev = data[-1]
+        canid = int(key[start] & 0xFFFFFFFF)
+        if canid in stats:
+            stats[canid].merge(entry)
+        else:
+            stats[canid] = entry
+    return stats
+
+
+def _source_stamp(filename):
+    """ Return what identifies a version of a recording """
+    info = os.stat(filename)
+    return [os.path.abspath(filename), info.st_mtime_ns, info.st_size]
+
+
+def load_state(filename):
+    """ Return the per recording statistics saved in a state file, or none if it is missing or outdated
+
+    Returns an OrderedDict recording path -> (stamp, dict CAN ID -> SignalStats). """
+    sources = collections.OrderedDict()
+    if not os.path.exists(filename):
+        return sources
+    with np.load(filename) as state:
+        if int(state['version']) != STATE_VERSION:
+            return sources
+        stamps = json.loads(str(state['sources']))
+        for stamp in stamps:
+            sources[stamp[0]] = (stamp, {})
+        for index, (owner, canid) in enumerate(zip(state['owners'], state['ids'])):
+            entry = SignalStats()
+            for name in SignalStats.__slots__:
+                setattr(entry, name, state[name][index].copy() if state[name].ndim > 1 else int(state[name][index]))
+            sources[stamps[owner][0]][1][int(canid)] = entry
+    return sources
+
+
+def save_state(filename, sources):
+    """ Save the per recording and per CAN ID statistics (see 'load_state()') """
+    rows = [(owner, canid, stats[canid]) for owner, (stamp, stats) in enumerate(sources.values()) for canid in sorted(stats)]
+    columns = {name: np.array([getattr(entry, name) for owner, canid, entry in rows], dtype=np.int64).reshape(
+        (len(rows),) + np.shape(getattr(SignalStats(), name))) for name in SignalStats.__slots__}
+    with open(filename, 'wb') as outfile:
+        np.savez(outfile, version=STATE_VERSION, owners=np.array([row[0] for row in rows], dtype=np.uint32),
+                 ids=np.array([row[1] for row in rows], dtype=np.uint32),
+                 sources=np.array(json.dumps([stamp for stamp, stats in sources.values()])), **columns)
+
+
+def merge_sources(sources):
+    """ Return the statistics of every CAN ID merged over all the recordings of 'load_state()' """
+    total = {}
+    for stamp, stats in sources.values():
+        for canid, entry in stats.items():
+            if canid not in total:
+                total[canid] = SignalStats()
+            total[canid].merge(entry)
+    return total
+
+
+def update(recordings, statefile=STATE_FILE):
+    """ Add the recordings not processed yet to the statistics of a state file and return them
+
+    A recording modified since it was processed replaces its previous statistics. """
+    sources = load_state(statefile)
+    changed = False
+    for recording in recordings:
+        stamp = _source_stamp(recording)
+        if stamp[0] in sources and sources[stamp[0]][0] == stamp:   # Already processed: nothing to do
+            continue
+        sources[stamp[0]] = (stamp, collect(sccache.load(recording)))
+        changed = True
+    if changed:
+        save_state(statefile, sources)
+    return merge_sources(sources)
+
+
+def _magnitude(rate):
+    """ Order of magnitude of a toggle rate (bits that never toggle have none) """
+    return math.ceil(math.log10(rate)) if rate > 0 else None
+
+
+def infer(stats):
+    """ Propose the signals of a CAN ID from its SignalStats
+
+    Returns a list of dicts with 'name', 'positions' (bit positions, MSB first), 'order'
+    ('big' or 'little'), 'signed' and 'comment'. """
+    signals = []
+    if stats.transitions == 0:
+        return signals
+    rate = stats.toggles / stats.transitions
+    reserved = np.zeros(64, dtype=bool)
+
+    # 1. Rolling counters (a Byte wins over its own nibbles only if its high nibble changes too) and checksums
+    ratio = stats.counters / stats.transitions
+    for byte in range(stats.dlc):
+        nibbles = max(ratio[byte * 2], ratio[byte * 2 + 1])
+        if (ratio[16 + byte] >= COUNTER_THRESHOLD and ratio[16 + byte] >= nibbles
+                and rate[byte * 8:byte * 8 + 4].any()):
+            candidates = [(list(range(byte * 8, byte * 8 + 8)), ratio[16 + byte])]
+        else:
+            candidates = [(list(range(byte * 8 + 4 * half, byte * 8 + 4 * half + 4)), ratio[byte * 2 + half])
+                          for half in (0, 1) if ratio[byte * 2 + half] >= COUNTER_THRESHOLD]
+        for positions, hits in candidates:
+            signals.append({'name': 'COUNTER%s' % (len(signals) or ''), 'positions': positions, 'order': 'big', 'signed': False,
+                            'comment': 'rolling counter, +1 in %.1f%% of the frames' % (hits * 100)})
+            reserved[positions] = True
+
+    matches = stats.checksums / max(stats.frames, 1)
+    candidates = []                                            # XOR is symmetric: only one checksum Byte is kept
+    for byte in range(stats.dlc):
+        positions = list(range(byte * 8, byte * 8 + 8))
+        best = int(np.argmax(matches[byte]))
+        if matches[byte, best] >= CHECKSUM_THRESHOLD and rate[positions].any() and not reserved[positions].any():
+            preference = 2 if byte == stats.dlc - 1 else 1 if byte == 0 else 0   # Usually the last or the first Byte
+            candidates.append((round(matches[byte, best], 3), preference, byte, best))
+    if candidates:
+        hits, _, byte, best = max(candidates)
+        positions = list(range(byte * 8, byte * 8 + 8))
+        signals.append({'name': 'CHECKSUM', 'positions': positions, 'order': 'big', 'signed': False,
+                        'comment': '%s checksum, matched %.1f%% of the frames' % (list(CHECKSUMS)[best], hits * 100)})
+        reserved[positions] = True
+
+    # 2. Fields of correlated changing bits in Motorola order
+    fields = []
+    current = []
+    for pos in range(stats.dlc * 8):
+        if rate[pos] == 0 or reserved[pos]:
+            if current:
+                fields.append(current)
+            current = []
+            continue
+        if current:
+            prev = current[-1]
+            carry = stats.cotoggles[prev, pos] / stats.toggles[prev]
+            lift = (carry - rate[pos]) / (1 - rate[pos]) if rate[pos] < 1 else 1.0    # 0 if independent, 1 if linked
+            if (_magnitude(rate[pos]) < _magnitude(rate[prev])
+                    or (lift < CARRY_THRESHOLD and (rate[pos] < NOISE_RATE or pos % 8 == 0))):
+                fields.append(current)
+                current = []
+        current.append(pos)
+    if current:
+        fields.append(current)
+
+    # 3. Little endian fields across Byte boundaries
+    merged = []
+    for field in fields:
+        if merged:
+            last = merged[-1]
+            top = last['positions'][:8]                        # Most significant Byte of the candidate little endian field
+            byte = top[0] // 8
+            if (top == list(range(byte * 8, byte * 8 + 8)) and field[0] // 8 == byte + 1
+                    and field[-1] == byte * 8 + 15):
+                carry = stats.cotoggles[field[-1], top[0]] / stats.toggles[field[-1]]
+                if carry >= CARRY_THRESHOLD:                   # The next Byte LSB toggles with the previous Byte MSB
+                    last['positions'] = field + last['positions']
+                    last['order'] = 'little'
+                    continue
+        merged.append({'positions': field, 'order': 'big'})
+    for field in merged:                                       # Multi Byte fields take the constant MSBs of their Byte
+        positions = field['positions']
+        first = positions[0] - positions[0] % 8
+        if len(positions) > 8 and not (rate[first:positions[0]].any() or reserved[first:positions[0]].any()):
+            field['positions'] = list(range(first, positions[0])) + positions
+
+    # 4. Signedness
+    for index, field in enumerate(merged):
+        positions = field['positions']
+        msb = positions[0]
+        signed = False
+        if len(positions) > 2 and positions[1] == msb + 1:
+            ones = stats.ones[msb] / stats.frames
+            signed = (SIGN_MIN_RATIO <= ones <= 1 - SIGN_MIN_RATIO
+                      and stats.agree[msb] / stats.frames >= SIGN_THRESHOLD)
+        signals.append({'name': 'S%s' % index, 'positions': positions, 'order': field['order'], 'signed': signed,
+                        'comment': ''})
+
+    signals.sort(key=lambda signal: min(signal['positions']))
+    return signals
+
+
+def dbc_start(signal):
+    """ Return the DBC start bit of a signal (MSB for big endian, LSB for little endian) """
+    pos = signal['positions'][0] if signal['order'] == 'big' else signal['positions'][-1]
+    return (pos // 8) * 8 + 7 - pos % 8
+
+
+def write_dbc(stats, filename):
+    """ Write the proposed signals of every CAN ID as a DBC-like file """
+    comments = []
+    with open(filename, 'w') as outfile:
+        outfile.write('VERSION "scsig %s"\n\n' % __version__)
+        outfile.write('BU_: Vector__XXX\n')
+        for canid in sorted(stats):
+            entry = stats[canid]
+            name = sccache.format_canid(canid)
+            outfile.write('\nBO_ %s ID_%s: %s Vector__XXX\n' % (canid, name, entry.dlc))
+            for signal in infer(entry):
+                lenght = len(signal['positions'])
+                if signal['signed']:
+                    low, high = -(1 << (lenght - 1)), (1 << (lenght - 1)) - 1
+                else:
+                    low, high = 0, (1 << lenght) - 1
+                outfile.write(' SG_ %s : %s|%s@%s%s (1,0) [%s|%s] "" Vector__XXX\n' % (
+                    signal['name'], dbc_start(signal), lenght, '0' if signal['order'] == 'big' else '1',
+                    '-' if signal['signed'] else '+', low, high))
+                if signal['comment']:
+                    comments.append('CM_ SG_ %s %s "%s";\n' % (canid, signal['name'], signal['comment']))
+        if comments:
+            outfile.write('\n')
+            outfile.writelines(comments)
+
+
+def _synthetic_stats(payloads, dlc=8):
+    """ Return the SignalStats of a sequence of synthetic payloads """
+    entry = SignalStats()
+    entry.add(np.asarray(payloads, dtype=np.uint8), dlc)
+    return entry
+
+
+def _layout(stats):
+    """ Return the proposed signals of a SignalStats as (name, DBC start bit, lenght, order, signed) tuples """
+    return [(signal['name'].rstrip('0123456789'), dbc_start(signal), len(signal['positions']), signal['order'],
+             signal['signed']) for signal in infer(stats)]
+
+
+def self_test(out=sys.stdout):
+    """ Check the inference on synthetic payloads of known layout, print out the results and return True if all passed """
+    frames = 20000
+    number = np.arange(frames)
+    checks = []
+
+    payloads = np.zeros((frames, 8), dtype=np.uint8)           # 4 bits counter under a constant high nibble
+    payloads[:, 5] = 0xA0 | (number & 0x0F)
+    checks.append(('4 bits counter in a low nibble', _layout(_synthetic_stats(payloads)),
+                   [('COUNTER', 43, 4, 'big', False)]))
+
+    payloads = np.zeros((frames, 8), dtype=np.uint8)           # Slow BE16 (3 constant MSBs) and fast signed LE16
+    slow = (4000 + 3000 * np.sin(number / 300.0)).astype(np.int64)
+    fast = (8000 * np.sin(number / 7.0)).astype(np.int64) + np.random.RandomState(0).randint(-50, 50, frames)
+    payloads[:, 0], payloads[:, 1] = slow >> 8, slow & 0xFF
+    payloads[:, 2], payloads[:, 3] = fast & 0xFF, (fast >> 8) & 0xFF
+    checks.append(('big endian and signed little endian 16 bits signals', _layout(_synthetic_stats(payloads)),
+                   [('S', 7, 16, 'big', False), ('S', 16, 16, 'little', True)]))
+
+    import scgen                                               # Only the self test requires the generator
+    rows = collections.defaultdict(list)
+    for timestamp, channel, canid, payload in scgen.frames(200000, ids=10):
+        if len(payload) == 8:
+            rows[canid].append(list(payload))
+    for canid in sorted(rows):                                 # scgen layout: Byte 0 counter, Bytes 1-2 signal, Byte 3 noise
+        if len(rows[canid]) >= frames // 4:                    # Enough frames to see the signal change
+            checks.append(('scgen.py layout of CAN ID %03X' % canid, _layout(_synthetic_stats(rows[canid])),
+                           [('COUNTER', 7, 8, 'big', False), ('S', 15, 16, 'big', False), ('S', 31, 8, 'big', False)]))
+
+    import tempfile                                            # A recording modified between two updates
+    with tempfile.TemporaryDirectory() as workdir:
+        recording, statefile = os.path.join(workdir, 'recording.dump'), os.path.join(workdir, STATE_FILE)
+        scgen.generate(recording, 20000, ids=10)
+        first = sum(entry.frames for entry in update([recording], statefile).values())
+        scgen.generate(recording, 30000, ids=10, seed=1)
+        os.utime(recording, ns=(os.stat(recording).st_atime_ns, os.stat(recording).st_mtime_ns + 10 ** 9))
+        second = sum(entry.frames for entry in update([recording], statefile).values())
+        third = sum(entry.frames for entry in update([recording], statefile).values())
+    checks.append(('modified recording replaces its statistics', [first, second, third], [20000, 30000, 30000]))
+
+    failed = 0
+    for name, found, expected in checks:
+        passed = found == expected
+        failed += not passed
+        print('%s: %s' % ('PASSED' if passed else 'FAILED', name), file=out)
+        if not passed:
+            print('    expected: %s\n    found:    %s' % (expected, found), file=out)
+    return failed == 0
+
+
+def main(argv=None):
+    """ Command line wrapper of the signals inference engine """
+    parser = argparse.ArgumentParser(description='Propose the signals layout of the CAN IDs of Socketcan CAN Bus dump files.')
+    parser.add_argument('recordings', nargs='*', help='Socketcan dump files (only the new ones are processed)')
+    parser.add_argument('-s', '--state', default=STATE_FILE,
+                        help="file of the cached per CAN ID statistics (default: '%s')" % STATE_FILE)
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE,
+                        help="DBC-like output file (default: '%s')" % OUTPUT_FILE)
+    parser.add_argument('--self-test', action='store_true',
+                        help='check the inference on synthetic payloads of known layout and exit')
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if self_test() else 1
+    stats = update(args.recordings, args.state)
+    write_dbc(stats, args.output)
+    print('CAN IDs: %s' % len(stats))
+    print('Signals layout written to: %s' % args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())